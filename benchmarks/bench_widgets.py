@@ -0,0 +1,263 @@
+# Headless rendering benchmarks for the Chrono-Compass widgets.
+#
+# Renders DarkModeRotating24hClock, the upcoming events panel (both list
+# modes) and PomodoroTimerWidget into an offscreen QImage for synthetic
+# schedules of growing size and saves the timings as JSON, so two versions of
+# the app can be compared.
+#
+#   python benchmarks/bench_widgets.py
+#   python benchmarks/bench_widgets.py --events 10 100 --sizes 800 --repeat 50
+#   python benchmarks/bench_widgets.py --compare benchmarks/results/old.json
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# main.py loads its icons and schedules relative to the working directory
+os.chdir(ROOT)
+
+from PyQt6.QtCore import QT_VERSION_STR, PYQT_VERSION_STR
+from PyQt6.QtGui import QImage
+from PyQt6.QtWidgets import QApplication
+
+import main
+from event_store import Event, DAY_SECONDS
+from tests.test_pomodoro import simulate_late_polls
+
+EVENT_COUNTS = [10, 100, 1000, 10000]
+WIDGET_SIZES = [400, 800, 1600]
+
+
+def synthetic_events(count, seed=0):
+    # Random blocks aligned to 5 minutes, 5 minutes to 2 hours long, some of
+    # them wrapping around midnight and some with unknown categories
+    rng = random.Random(seed)
+    categories = list(main.CATEGORY_COLORS) + ["Unknown"]
+    generated = []
+    for i in range(count):
+        start = rng.randrange(0, DAY_SECONDS, 300)
+        end = (start + rng.randrange(300, 7200 + 1, 300)) % DAY_SECONDS
+        generated.append(Event(f"Event {i}", start, end, rng.choice(categories)))
+    return generated
+
+
+def timed(function, repeat):
+    # Wall time of every call in ms, then one more call under tracemalloc for
+    # the Python allocations (kept out of the timings, tracing is slow)
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    function()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "mean_ms": statistics.fmean(durations),
+        "median_ms": statistics.median(durations),
+        "max_ms": max(durations),
+        "alloc_peak_kib": (peak - before) / 1024,
+        "alloc_retained_kib": (after - before) / 1024,
+    }
+
+
+def render_into(widget, size):
+    image = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied)
+
+    def render():
+        image.fill(0)
+        widget.render(image)
+
+    return render
+
+
+def bench_clock(size, repeat):
+    clock = main.DarkModeRotating24hClock()
+    clock.setMinimumSize(0, 0)
+    clock.resize(size, size)
+    render = render_into(clock, size)
+    # The first paint builds the face layer and the event geometry
+    start = time.perf_counter()
+    render()
+    cold_ms = (time.perf_counter() - start) * 1000
+    steady = timed(render, repeat)
+    clock.deleteLater()
+    return {"cold_paint_ms": cold_ms, "paint": steady}
+
+
+def bench_events_list(list_class, repeat):
+    widget = list_class()
+    widget.resize(400, 800)
+
+    def rebuild():
+        # Forces a schedule reload: every row is dropped and rebuilt
+        widget.lastUpdateKey = None
+        widget.updateEventsList()
+
+    def minute():
+        # Same schedule, a new minute: only changed rows are touched
+        widget.lastUpdateKey = (main.events.version, None)
+        widget.updateEventsList()
+
+    result = {
+        "rebuild": timed(rebuild, max(1, repeat // 10)),
+        "minute_update": timed(minute, repeat),
+        "tick": timed(widget.updateEventsList, repeat),
+        "paint": timed(render_into(widget, 800), max(1, repeat // 10)),
+    }
+    widget.deleteLater()
+    return result
+
+
+def bench_hover(repeat):
+    rng = random.Random(1)
+    angles = [rng.uniform(0, 360) for _ in range(1000)]
+
+    def hit_test():
+        for angle in angles:
+            main.events.at_angle(angle)
+
+    result = timed(hit_test, repeat)
+    # Report per lookup rather than per batch of 1000
+    result["mean_us"] = result.pop("mean_ms")
+    result["median_us"] = result.pop("median_ms")
+    result["max_us"] = result.pop("max_ms")
+    return result
+
+
+def bench_pomodoro(size, repeat):
+    pomodoro = main.PomodoroTimerWidget()
+    pomodoro.resize(size, size)
+    pomodoro.startStopTimer()
+    result = {"paint": timed(render_into(pomodoro, size), repeat)}
+    pomodoro.resetTimer()
+    pomodoro.deleteLater()
+    return result
+
+
+def pomodoro_drift(hours=8, seed=2):
+    # Simulated run on the shared per second tick and the session deadline
+    # timer, with injected latency, see tests/test_pomodoro.py. Returns how far
+    # the engine is from the wall clock at the end.
+    engine, finished, expected = simulate_late_polls(hours, seed)
+    return {
+        "simulated_hours": hours,
+        "sessions_finished": finished,
+        "drift_s": abs(engine.timeLeft() - expected),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def flatten(results, prefix=""):
+    # {"a": {"b": 1}} -> {"a.b": 1}, used to compare two runs
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(old_path, results):
+    with open(old_path) as file:
+        old = flatten(json.load(file)["results"])
+    new = flatten(results)
+    print(f"\nCompared with {old_path}")
+    for key in sorted(new.keys() & old.keys()):
+        if not key.endswith(("mean_ms", "mean_us")) or not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100
+        print(f"  {key:70s} {old[key]:10.3f} -> {new[key]:10.3f}  {change:+6.1f}%")
+
+
+def main_benchmarks(argv=None):
+    parser = argparse.ArgumentParser(description="Headless widget benchmarks")
+    parser.add_argument("--events", type=int, nargs="+", default=EVENT_COUNTS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=WIDGET_SIZES)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", help="JSON file, default benchmarks/results/")
+    parser.add_argument("--compare", help="previous JSON results to compare with")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    app.setStyle(main.APP_STYLE)
+
+    results = {"pomodoro_drift": pomodoro_drift()}
+    for size in args.sizes:
+        results.setdefault("pomodoro", {})[str(size)] = bench_pomodoro(
+            size, args.repeat
+        )
+
+    for count in args.events:
+        main.events.replace(synthetic_events(count))
+        byCount = results.setdefault("schedules", {})[str(count)] = {}
+        print(f"{count} events")
+        for size in args.sizes:
+            byCount.setdefault("clock", {})[str(size)] = bench_clock(size, args.repeat)
+            print(f"  clock {size}px done")
+        byCount["events_list_widgets"] = bench_events_list(
+            main.EventsListWidget, args.repeat
+        )
+        byCount["events_list_view"] = bench_events_list(
+            main.EventsListView, args.repeat
+        )
+        byCount["hover_hit_test"] = bench_hover(args.repeat)
+        print("  lists and hover done")
+        app.processEvents()  # Let deleteLater() run between schedules
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "platform": platform.platform(),
+            "qpa": os.environ["QT_QPA_PLATFORM"],
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+    output = args.output
+    if output is None:
+        os.makedirs("benchmarks/results", exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = f"benchmarks/results/{stamp}-{report['meta']['revision']}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main_benchmarks()
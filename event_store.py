@@ -0,0 +1,430 @@
+# Compact event storage shared by every widget. Times are kept as seconds since
+# midnight, categories as interned integer codes and the derived flags
+# (wraps around midnight, crosses the day start) are computed once at load.
+import functools
+import threading
+from array import array
+from bisect import bisect_right
+from heapq import heapify, heappop, heappush
+from typing import NamedTuple
+
+DAY_SECONDS = 86400
+
+# Interned category codes, stable for the lifetime of the process so tables
+# indexed by category_id (colors, brushes) survive schedule reloads. Schedules
+# may be parsed on worker threads, new categories are added under a lock.
+category_ids = {}
+category_names = []
+category_lock = threading.Lock()
+
+
+def intern_category(category):
+    category_id = category_ids.get(category)
+    if category_id is None:
+        with category_lock:
+            if category not in category_ids:
+                category_ids[category] = len(category_names)
+                category_names.append(category)
+            category_id = category_ids[category]
+    return category_id
+
+
+def seconds_since_midnight(now):
+    return now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+
+
+@functools.lru_cache(maxsize=None)
+def format_hhmm(seconds):
+    return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}"
+
+
+def format_countdown(seconds):
+    return f"{(seconds // 3600):02d}h{((seconds % 3600) // 60):02d}m"
+
+
+def format_event_info(event, seconds, is_current):
+    # "16:30 - 20:30  |  00h57m left  |  Work" as shown in the events list,
+    # with the time left (current event) or until it starts at a time of day
+    if is_current:
+        time_to_event = f"{format_countdown((event.end - seconds) % DAY_SECONDS)} left"
+    else:
+        time_to_event = f"T - {format_countdown((event.start - seconds) % DAY_SECONDS)}"
+    return (
+        f"{event.start_label} - {event.end_label}  |  {time_to_event}  |  {event.name}"
+    )
+
+
+def parse_hhmm(text):
+    # "HH:MM" to seconds since midnight. "24:00" is accepted as midnight.
+    text = text.strip()
+    hours, separator, minutes = text.partition(":")
+    if (
+        separator
+        and hours.isdigit()
+        and len(minutes) == 2
+        and minutes.isdigit()
+        and (int(hours) < 24 or text == "24:00")
+        and int(minutes) < 60
+    ):
+        return int(hours) % 24 * 3600 + int(minutes) * 60
+    raise ValueError(f"invalid time {text!r}, expected HH:MM")
+
+
+def parse_event_columns(row):
+    # The name,start_time,end_time,category columns of a schedule row, cleaned
+    # up. Raises ValueError with the reason the row can't be used.
+    if len(row) < 4:
+        raise ValueError(
+            f"expected at least 4 columns (name,start_time,end_time,category), "
+            f"got {len(row)}"
+        )
+    name = row[0].strip()
+    if not name:
+        raise ValueError("empty name")
+    category = row[3].strip()
+    if not category:
+        raise ValueError("empty category")
+    return name, parse_hhmm(row[1]), parse_hhmm(row[2]), category
+
+
+class ScheduleIssue(NamedTuple):
+    # A schedule row that was rejected, or a whole file when line is 0
+    filepath: str
+    line: int
+    reason: str
+
+    def __str__(self):
+        if self.line:
+            return f"{self.filepath}:{self.line}: {self.reason}"
+        return f"{self.filepath}: {self.reason}"
+
+
+class Event:
+    __slots__ = (
+        "name",
+        "start",
+        "end",
+        "category",
+        "category_id",
+        "wraps",
+        "start_label",
+        "end_label",
+    )
+
+    def __init__(self, name, start, end, category):
+        self.name = name
+        self.start = start  # Seconds since midnight
+        self.end = end
+        self.category = category
+        self.category_id = intern_category(category)
+        self.wraps = start > end  # Goes past midnight
+        self.start_label = format_hhmm(start)
+        self.end_label = format_hhmm(end)
+
+    def duration(self):
+        return (self.end - self.start) % DAY_SECONDS
+
+    def __repr__(self):
+        return f"Event({self.name!r}, {self.start_label}-{self.end_label}, {self.category!r})"
+
+
+class AngularIntervalIndex:
+    # Splits the day into elementary arcs between consecutive event boundaries
+    # and stores every event covering each arc. Events wrapping around
+    # midnight are split in two. Looking up a time of day is then one bisect.
+    def __init__(self, events):
+        starts_at = {}
+        ends_at = {}
+        for event in events:
+            if event.start == event.end:
+                continue
+            starts_at.setdefault(event.start, []).append(event)
+            # Ending at 00:00 is ending with the day: no piece after midnight
+            if event.end:
+                ends_at.setdefault(event.end, []).append(event)
+                if event.wraps:
+                    starts_at.setdefault(0, []).append(event)
+
+        self.boundaries = sorted({0} | starts_at.keys() | ends_at.keys())
+        self.covering = []
+        active = {}
+        for boundary in self.boundaries:
+            for event in ends_at.get(boundary, ()):
+                active.pop(id(event), None)
+            for event in starts_at.get(boundary, ()):
+                active[id(event)] = event
+            self.covering.append(tuple(active.values()))
+
+    def events_at(self, seconds):
+        # All events under a time of day (in seconds since midnight)
+        i = bisect_right(self.boundaries, seconds % DAY_SECONDS) - 1
+        return self.covering[i]
+
+
+def assign_lanes(events):
+    # Sweep line over the events' intervals around the 24h circle. Returns, in
+    # the order of events, the lane of each event (0 for the outermost), the
+    # number of lanes of its group of overlapping events and whether it
+    # overlaps another event at all. O(n log n).
+    count = len(events)
+    lanes = [0] * count
+    lane_counts = [1] * count
+    conflicts = [False] * count
+    spans = [
+        (i, event.start, (event.end - event.start) % DAY_SECONDS)
+        for i, event in enumerate(events)
+        if event.start != event.end
+    ]
+    if not spans:
+        return lanes, lane_counts, conflicts
+
+    # Unroll the circle where the fewest events are going on, so that with
+    # any gap in the day the problem is a plain linear one
+    deltas = {}
+    for i, start, length in spans:
+        deltas[start] = deltas.get(start, 0) + 1
+        end = (start + length) % DAY_SECONDS
+        deltas[end] = deltas.get(end, 0) - 1
+    boundaries = sorted(deltas)
+    cut = boundaries[0]
+    active = sum((cut - start) % DAY_SECONDS < length for _, start, length in spans)
+    fewest = active
+    for boundary in boundaries[1:]:
+        active += deltas[boundary]
+        if active < fewest:
+            cut, fewest = boundary, active
+
+    # (start, end) relative to the cut. The events going over the cut get the
+    # first lanes, which are then only free between their two parts.
+    crossing = []
+    linear = []  # (start, -length, event, second part of a crossing event)
+    for i, start, length in spans:
+        start = (start - cut) % DAY_SECONDS
+        if start + length > DAY_SECONDS:
+            crossing.append((i, start, start + length - DAY_SECONDS))
+            linear.append((start, start - DAY_SECONDS, i, True))
+        else:
+            linear.append((start, -length, i, False))
+    linear.sort()
+
+    reserved_until = []  # Lane -> start of its crossing event's second part
+    ending = []  # Heap of (end, lane) of the lanes in use
+    for lane, (i, start, end) in enumerate(crossing):
+        lanes[i] = lane
+        reserved_until.append(start)
+        heappush(ending, (end, lane))
+    free = []  # Heap of free lanes
+    lane_total = len(crossing)
+    groups = []  # ([events overlapping one another], lanes they use)
+    group = [i for i, _, _ in crossing]
+    group_lanes = lane_total
+
+    for start, length, i, second_part in linear:
+        end = start - length
+        while ending and ending[0][0] <= start:
+            heappush(free, heappop(ending)[1])
+        if not ending and group:
+            # Nothing going on, the next events start a new group
+            groups.append((group, group_lanes))
+            group = []
+            group_lanes = 0
+
+        if second_part:
+            # Its lane was kept free for it
+            lane = lanes[i]
+            free.remove(lane)
+            heapify(free)
+        else:
+            rejected = []
+            while free and free[0] < len(crossing) and end > reserved_until[free[0]]:
+                rejected.append(heappop(free))
+            if free:
+                lane = heappop(free)
+            else:
+                lane = lane_total
+                lane_total += 1
+            for kept in rejected:
+                heappush(free, kept)
+            lanes[i] = lane
+
+        heappush(ending, (end, lane))
+        group.append(i)
+        group_lanes = max(group_lanes, lane + 1)
+    groups.append((group, group_lanes))
+
+    if crossing and len(groups) > 1:
+        # The last group goes on into the first one, over the cut
+        (first, first_lanes), (last, last_lanes) = groups[0], groups.pop()
+        groups[0] = (first + last, max(first_lanes, last_lanes))
+    for group, group_lanes in groups:
+        for i in group:
+            lane_counts[i] = group_lanes
+
+    # An interval overlaps an earlier one (by start) if it starts before the
+    # latest end so far, and then it overlaps the one owning that end
+    pieces = [(start, start - length, i) for start, length, i, _ in linear]
+    pieces += [(0, end, i) for i, _, end in crossing]
+    pieces.sort()
+    latest_end, latest = -1, None
+    for start, end, i in pieces:
+        if start < latest_end and latest != i:
+            conflicts[i] = conflicts[latest] = True
+        if end > latest_end:
+            latest_end, latest = end, i
+    return lanes, lane_counts, conflicts
+
+
+class ScheduleState:
+    # Which events are current, still to come or past during one segment of
+    # the timeline (between two consecutive transitions), see state_at()
+    __slots__ = ("segment", "current", "current_ids", "pending", "past")
+
+    def __init__(self, store, segment):
+        self.segment = segment
+        relative = store.transitions[segment]
+        seconds = (relative + store.day_start) % DAY_SECONDS
+        self.pending = tuple(store.pending(seconds))  # Current and upcoming
+        self.current = tuple(  # In day order
+            event for event in self.pending if store.is_current(event, seconds)
+        )
+        self.current_ids = frozenset(map(id, self.current))
+        # Aligned with store.events
+        self.past = array(
+            "b",
+            (
+                not crosses and relative_end <= relative
+                for crosses, relative_end in zip(
+                    store.crosses_day_start, store.relative_ends
+                )
+            ),
+        )
+
+
+class EventStore:
+    # The events of the displayed day, ordered as they happen from the day
+    # start (e.g. 06:00) onwards, with struct-of-arrays columns for the hot
+    # paths. replace() builds everything first and swaps it in at the end.
+    def __init__(self, day_start=6, events=()):
+        self.day_start = day_start * 3600
+        self.version = 0
+        self.replace(events)
+
+    def relative(self, seconds):
+        # Seconds since the day start
+        return (seconds - self.day_start) % DAY_SECONDS
+
+    def replace(self, events):
+        ordered = tuple(sorted(events, key=lambda event: self.relative(event.start)))
+        relative_starts = array("i", (self.relative(e.start) for e in ordered))
+        relative_ends = array("i", (self.relative(e.end) for e in ordered))
+        # Events going over the day start (e.g. sleeping from 01:30 to 10:30)
+        # are never "past": their other half is still to come
+        crosses_day_start = array(
+            "b",
+            (
+                e.start != e.end and rel_end <= rel_start
+                for e, rel_start, rel_end in zip(
+                    ordered, relative_starts, relative_ends
+                )
+            ),
+        )
+
+        self.events = ordered
+        self.starts = array("i", (e.start for e in ordered))
+        self.ends = array("i", (e.end for e in ordered))
+        self.category_codes = array("H", (e.category_id for e in ordered))
+        self.wraps = array("b", (e.wraps for e in ordered))
+        self.relative_starts = relative_starts
+        self.relative_ends = relative_ends
+        self.crosses_day_start = crosses_day_start
+        self.positions = {id(event): i for i, event in enumerate(ordered)}
+        self.index = AngularIntervalIndex(ordered)
+        # Concentric sub-ring of each event on the dial, see assign_lanes()
+        lanes, lane_counts, conflicts = assign_lanes(ordered)
+        self.lanes = array("H", lanes)
+        self.lane_counts = array("H", lane_counts)
+        self.conflicts = array("b", conflicts)
+        # Timeline: every time an event starts or ends (and the day start), in
+        # seconds since the day start. Nothing changes in between.
+        self.transitions = array("i", sorted({0, *relative_starts, *relative_ends}))
+        self.state = None  # ScheduleState of the last segment asked for
+        self.version += 1
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __getitem__(self, i):
+        return self.events[i]
+
+    def is_past(self, event, seconds):
+        i = self.positions[id(event)]
+        if self.crosses_day_start[i]:
+            return False
+        return self.relative_ends[i] <= self.relative(seconds)
+
+    def is_current(self, event, seconds):
+        i = self.positions[id(event)]
+        now = self.relative(seconds)
+        if self.crosses_day_start[i]:
+            return now >= self.relative_starts[i] or now < self.relative_ends[i]
+        return self.relative_starts[i] <= now < self.relative_ends[i]
+
+    def layout(self, event):
+        # (lane, lanes, overlaps another event) of an event on the dial
+        i = self.positions[id(event)]
+        return self.lanes[i], self.lane_counts[i], bool(self.conflicts[i])
+
+    def current(self, seconds):
+        # Events happening at a time of day, in day order
+        return sorted(
+            self.index.events_at(int(seconds)),
+            key=lambda event: self.positions[id(event)],
+        )
+
+    def upcoming(self, seconds):
+        # Events that have not started yet, in day order
+        first = bisect_right(self.relative_starts, self.relative(seconds))
+        return [
+            event
+            for event in self.events[first:]
+            if not self.is_current(event, seconds)
+        ]
+
+    def past(self, seconds):
+        return [event for event in self.events if self.is_past(event, seconds)]
+
+    def pending(self, seconds):
+        # Current and upcoming events, in day order
+        now = self.relative(seconds)
+        return [
+            event
+            for event, crosses, rel_end in zip(
+                self.events, self.crosses_day_start, self.relative_ends
+            )
+            if crosses or rel_end > now
+        ]
+
+    def state_at(self, seconds):
+        # The state of the schedule at a time of day. It is only computed again
+        # once a transition has been crossed.
+        segment = bisect_right(self.transitions, self.relative(int(seconds))) - 1
+        if self.state is None or self.state.segment != segment:
+            self.state = ScheduleState(self, segment)
+        return self.state
+
+    def next_transition(self, seconds):
+        # The next time of day strictly after seconds at which an event starts
+        # or ends (or the day starts), wrapping around to the next day
+        i = bisect_right(self.transitions, self.relative(seconds))
+        relative = self.transitions[i] if i < len(self.transitions) else 0
+        return (relative + self.day_start) % DAY_SECONDS
+
+    def at_seconds(self, seconds):
+        return self.index.events_at(int(seconds))
+
+    def at_angle(self, angle):
+        # Events under an angle of the 24h dial, 0 degrees being midnight
+        return self.at_seconds(angle % 360 * DAY_SECONDS / 360)
@@ -0,0 +1,223 @@
+# Status feed for status bars (waybar, polybar, tmux...): the current and next
+# events of the displayed day as JSON lines, written to stdout or to every
+# client of a local Unix socket. A line is only written when an event starts
+# or ends and on minute boundaries (for the countdowns), the process sleeps in
+# between. No Qt at all is imported, started with "main.py --headless".
+#
+#   {"time": "16:32", "day": "2026-10-17", "current": [{"name": "Work", ...,
+#    "seconds": 14280, "text": "16:30 - 20:30  |  03h58m left  |  Work"}],
+#    "next": {...}, "issues": 0}
+#
+# "seconds" is the time left of a current event and the time until the next
+# one starts, "text" the line of the events list.
+import argparse
+import json
+import os
+import selectors
+import signal
+import socket
+import stat
+import sys
+import time
+from datetime import datetime
+
+from event_store import (
+    DAY_SECONDS,
+    EventStore,
+    format_event_info,
+    seconds_since_midnight,
+)
+from schedules import (
+    CATEGORY_COLORS,
+    day_start,
+    displayed_date,
+    load_schedule,
+    update_schedule_cache,
+)
+
+
+def event_status(event, seconds, is_current):
+    if is_current:
+        countdown = (event.end - seconds) % DAY_SECONDS
+    else:
+        countdown = (event.start - seconds) % DAY_SECONDS
+    return {
+        "name": event.name,
+        "category": event.category,
+        "color": CATEGORY_COLORS.get(event.category, CATEGORY_COLORS["Other"]),
+        "start": event.start_label,
+        "end": event.end_label,
+        "seconds": countdown,
+        "text": format_event_info(event, seconds, is_current),
+    }
+
+
+class StatusFeed:
+    # The displayed day's schedule, reloaded (only the files that changed are
+    # read again, see load_schedule()) every time a line is due
+    def __init__(self):
+        self.events = EventStore(day_start)
+        self.day = None
+        self.sources = None
+        self.issues = []
+
+    def reload(self, now):
+        day = displayed_date(now)
+        sources, issues = load_schedule(day)
+        if issues != self.issues:
+            for issue in issues:
+                print(f"Schedule issue: {issue}", file=sys.stderr)
+            self.issues = issues
+        if sources is None:
+            return  # Unreadable, the previous schedule is kept
+        if (
+            day != self.day
+            or self.sources is None
+            or len(sources) != len(self.sources)
+            or any(old is not new for old, new in zip(self.sources, sources))
+        ):
+            self.events.replace([event for source in sources for event in source])
+            self.day = day
+            self.sources = sources
+            update_schedule_cache()
+
+    def status(self, now):
+        self.reload(now)
+        seconds = int(seconds_since_midnight(now))
+        state = self.events.state_at(seconds)
+        upcoming = [e for e in state.pending if id(e) not in state.current_ids]
+        return {
+            "time": now.strftime("%H:%M"),
+            "day": self.day.isoformat() if self.day else None,
+            "current": [event_status(e, seconds, True) for e in state.current],
+            "next": event_status(upcoming[0], seconds, False) if upcoming else None,
+            "issues": len(self.issues),
+        }
+
+    def secondsToNextLine(self, now):
+        # Until the next minute boundary or transition, whichever comes first
+        seconds = seconds_since_midnight(now)
+        transition = self.events.next_transition(int(seconds))
+        return min(60 - seconds % 60, (transition - seconds) % DAY_SECONDS or 60)
+
+
+class StdoutOutput:
+    def write(self, line):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+
+    def close(self):
+        pass
+
+
+class SocketOutput:
+    # Every client gets the last line as soon as it connects, then each new
+    # one. Clients that hang up or don't keep up are dropped.
+    def __init__(self, path):
+        self.path = path
+        try:
+            if stat.S_ISSOCK(os.stat(path).st_mode):
+                os.unlink(path)  # Left over by a previous run
+        except FileNotFoundError:
+            pass
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ)
+        self.clients = []
+        self.last = None
+
+    def send(self, client, line):
+        try:
+            client.sendall(line.encode() + b"\n")
+        except OSError:  # Gone, or its buffer is full
+            self.drop(client)
+
+    def drop(self, client):
+        self.selector.unregister(client)
+        self.clients.remove(client)
+        client.close()
+
+    def write(self, line):
+        self.last = line
+        for client in list(self.clients):
+            self.send(client, line)
+
+    def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            for key, _ in self.selector.select(remaining):
+                if key.fileobj is self.server:
+                    client, _ = self.server.accept()
+                    client.setblocking(False)
+                    self.selector.register(client, selectors.EVENT_READ)
+                    self.clients.append(client)
+                    if self.last is not None:
+                        self.send(client, self.last)
+                else:
+                    # Clients aren't expected to send anything
+                    try:
+                        data = key.fileobj.recv(1024)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        self.drop(key.fileobj)
+
+    def close(self):
+        for client in list(self.clients):
+            self.drop(client)
+        self.server.close()
+        os.unlink(self.path)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="Chrono-Compass --headless",
+        description="Print the current and next events as JSON lines, when an "
+        "event starts or ends and every minute.",
+    )
+    parser.add_argument("--headless", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="serve the lines on a local Unix socket instead of stdout",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="print the current status and exit (e.g. for tmux)",
+    )
+    args = parser.parse_args(argv)
+    if args.socket and not hasattr(socket, "AF_UNIX"):
+        parser.error("Unix sockets are not supported on this platform")
+    return args
+
+
+def main(argv):
+    args = parse_args(argv)
+    feed = StatusFeed()
+    if args.once:
+        print(json.dumps(feed.status(datetime.now())))
+        return 0
+
+    output = SocketOutput(args.socket) if args.socket else StdoutOutput()
+    # Still clean up (remove the socket) when stopped by the service manager
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        while True:
+            now = datetime.now()
+            output.write(json.dumps(feed.status(now)))
+            # Woken up 1ms after the boundary rather than just before it
+            output.wait(feed.secondsToNextLine(now) + 0.001)
+    except KeyboardInterrupt:
+        return 0
+    except BrokenPipeError:
+        # The reader went away, don't fail again when stdout is flushed at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        output.close()
@@ -0,0 +1,354 @@
+# Streaming import of iCalendar (.ics) files, e.g. calendar exports dropped in
+# week_schedules/. The file is read one line at a time and only the events of
+# a window of schedule days (the displayed week) are kept, so the memory used
+# doesn't grow with the size of the file.
+#
+# Timed VEVENTs are mapped onto the day-based model of the .csv schedules: an
+# event belongs to the schedule day it starts on (an event at 02:00 belongs to
+# the previous day, see day_start) and one going past midnight becomes a
+# wrapping event. Events longer than a schedule day are cut at each day start.
+# All-day and cancelled events are skipped. RRULE, EXDATE and RECURRENCE-ID are
+# supported through recurrence.py.
+import re
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9, TZIDs are then read as local times
+    ZoneInfo = None
+
+from event_store import Event, ScheduleIssue
+from recurrence import Rule
+
+DEFAULT_CATEGORY = "Other"
+
+# Past this many, the remaining issues of a file are only counted
+MAX_ISSUES = 50
+
+DURATION = re.compile(
+    r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+# Rule parts that don't change which days a rule occurs on
+IGNORED_RULE_PARTS = ("WKST",)
+
+time_zones = {}
+
+
+def unfolded_lines(lines):
+    # Joins the folded lines (continuations start with a space or a tab) and
+    # yields (number of the first physical line, logical line)
+    pending = None
+    pending_number = 0
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield pending_number, pending
+        pending = line
+        pending_number = number
+    if pending is not None:
+        yield pending_number, pending
+
+
+def parse_property(line):
+    # 'DTSTART;TZID=Europe/Lisbon:20260105T090000' ->
+    # ("DTSTART", {"TZID": "Europe/Lisbon"}, "20260105T090000")
+    i = line.find(":")
+    if i < 0:
+        raise ValueError(f"not a property line: {line[:40]!r}")
+    if '"' in line[:i]:
+        # Colons inside quoted parameter values don't end the parameters
+        quoted = False
+        for i, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif char == ":" and not quoted:
+                break
+    name, *parameters = line[:i].split(";")
+    params = {}
+    for parameter in parameters:
+        key, _, value = parameter.partition("=")
+        params[key.upper()] = value.strip('"')
+    return name.upper(), params, line[i + 1 :]
+
+
+def unescape_text(value):
+    return re.sub(
+        r"\\(.)",
+        lambda match: "\n" if match.group(1) in "nN" else match.group(1),
+        value,
+    )
+
+
+def time_zone(name):
+    # None for unknown zones (e.g. Windows names), read as local time then
+    if name not in time_zones:
+        try:
+            time_zones[name] = ZoneInfo(name) if ZoneInfo else None
+        except (ZoneInfoNotFoundError, ValueError):
+            time_zones[name] = None
+    return time_zones[name]
+
+
+def parse_ics_datetime(params, value):
+    # A naive local datetime, or a date for all-day values
+    # (sliced by hand, strptime is most of the import time otherwise)
+    value = value.strip()
+    try:
+        if not value[:8].isdigit():
+            raise ValueError
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+        if value[8] != "T" or not value[9:15].isdigit() or len(value[9:15]) < 6:
+            raise ValueError
+        moment = datetime(
+            int(value[:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[9:11]),
+            int(value[11:13]),
+            int(value[13:15]),
+        )
+    except (ValueError, IndexError):
+        raise ValueError(f"invalid date-time {value!r}") from None
+    if value.endswith("Z"):
+        zone = timezone.utc
+    else:
+        zone = time_zone(params["TZID"]) if "TZID" in params else None
+    if zone is not None:
+        moment = moment.replace(tzinfo=zone).astimezone().replace(tzinfo=None)
+    return moment
+
+
+def parse_duration(value):
+    match = DURATION.match(value.strip())
+    if not match or not any(match.groups()[1:]):
+        raise ValueError(f"invalid duration {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(
+        weeks=int(weeks or 0),
+        days=int(days or 0),
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+    )
+    return -duration if sign == "-" else duration
+
+
+def category_for(value, categories):
+    # The first of the event's CATEGORIES that is a known category (case
+    # insensitive), DEFAULT_CATEGORY otherwise
+    for category in unescape_text(value).split(","):
+        known = categories.get(category.strip().lower())
+        if known:
+            return known
+    return DEFAULT_CATEGORY
+
+
+def seconds_of(moment):
+    return moment.hour * 3600 + moment.minute * 60
+
+
+class CalendarImport:
+    # Collects the events of the schedule days first_day to last_day (both
+    # included) while VEVENTs are fed to it one at a time, see import_ics()
+    def __init__(self, first_day, last_day, categories=(), day_start=6, filepath=""):
+        self.first_day = first_day
+        self.last_day = last_day
+        self.categories = {category.lower(): category for category in categories}
+        self.day_start = timedelta(hours=day_start)
+        self.filepath = filepath
+        self.days = {}  # Schedule day -> events
+        # Recurring events that may occur in the window, by UID: (rule, offset
+        # from the schedule day to the rule's calendar day)
+        self.rules = {}
+        # (UID, calendar day) of the occurrences replaced by a RECURRENCE-ID
+        self.overridden = set()
+        self.issues = []
+        self.skipped_issues = 0
+        # Events starting after or ending before these (YYYYMMDD, with a day
+        # of margin for the time zones) are dropped before being parsed
+        self.skip_after = (last_day + timedelta(days=2)).strftime("%Y%m%d")
+        self.skip_before = (first_day - timedelta(days=1)).strftime("%Y%m%d")
+
+    def schedule_day(self, moment):
+        return (moment - self.day_start).date()
+
+    def add_issue(self, line, reason):
+        if len(self.issues) < MAX_ISSUES:
+            self.issues.append(ScheduleIssue(self.filepath, line, reason))
+        else:
+            self.skipped_issues += 1
+
+    def add_event(self, line, properties):
+        # properties: name -> (params, value) of one VEVENT, the last one wins
+        # except for EXDATE which is a list
+        try:
+            self.add_parsed_event(properties)
+        except (KeyError, ValueError) as error:
+            reason = f"missing {error}" if isinstance(error, KeyError) else error
+            self.add_issue(line, f"event skipped: {reason}")
+
+    def add_parsed_event(self, properties):
+        if properties.get("STATUS", (None, ""))[1].upper() == "CANCELLED":
+            return
+        if "RECURRENCE-ID" not in properties:
+            if properties["DTSTART"][1][:8] > self.skip_after:
+                return
+            if "RRULE" not in properties and (
+                properties.get("DTEND", ({}, "99999999"))[1][:8] < self.skip_before
+            ):
+                return
+        start = parse_ics_datetime(*properties["DTSTART"])
+        if not isinstance(start, datetime):
+            return  # All-day, nothing to draw on a 24h dial
+        if "DTEND" in properties:
+            end = parse_ics_datetime(*properties["DTEND"])
+        elif "DURATION" in properties:
+            end = start + parse_duration(properties["DURATION"][1])
+        else:
+            end = start
+        if not isinstance(end, datetime) or end <= start:
+            return  # Instant or malformed, nothing to draw
+
+        name = unescape_text(properties.get("SUMMARY", ({}, ""))[1]).strip()
+        name = name or "(no title)"
+        category = category_for(
+            properties.get("CATEGORIES", ({}, ""))[1], self.categories
+        )
+        uid = properties.get("UID", ({}, ""))[1]
+
+        if "RECURRENCE-ID" in properties:
+            replaced = parse_ics_datetime(*properties["RECURRENCE-ID"])
+            if isinstance(replaced, datetime):
+                replaced = replaced.date()
+            # Only the ones that matter to the window are remembered
+            if self.first_day <= replaced <= self.last_day + timedelta(days=1):
+                self.overridden.add((uid, replaced))
+
+        if "RRULE" in properties:
+            self.add_rule(uid, name, start, end, category, properties)
+        else:
+            self.add_occurrence(name, start, end, category)
+
+    def add_occurrence(self, name, start, end, category):
+        # Cut at every day start the event goes over, only the pieces inside
+        # the window are kept
+        day = max(self.schedule_day(start), self.first_day)
+        last = min(self.schedule_day(end - timedelta(microseconds=1)), self.last_day)
+        while day <= last:
+            day_begins = datetime.combine(day, datetime.min.time()) + self.day_start
+            piece_start = max(start, day_begins)
+            piece_end = min(end, day_begins + timedelta(days=1))
+            if piece_end - piece_start == timedelta(days=1):
+                # start == end would be an empty event, stop a minute short
+                piece_end -= timedelta(minutes=1)
+            if piece_end > piece_start:
+                self.days.setdefault(day, []).append(
+                    Event(
+                        name, seconds_of(piece_start), seconds_of(piece_end), category
+                    )
+                )
+            day += timedelta(days=1)
+
+    def add_rule(self, uid, name, start, end, category, properties):
+        if end - start >= timedelta(days=1):
+            raise ValueError("recurring events longer than a day are not supported")
+        rule = ";".join(
+            part
+            for part in properties["RRULE"][1].split(";")
+            if part.partition("=")[0].upper() not in IGNORED_RULE_PARTS
+        )
+        exceptions = []
+        for params, value in properties.get("EXDATE", ()):
+            for exception in value.split(","):
+                exception = parse_ics_datetime(params, exception)
+                if isinstance(exception, datetime):
+                    exception = exception.date()
+                exceptions.append(exception)
+        rule = Rule(
+            name,
+            seconds_of(start),
+            seconds_of(end),
+            category,
+            start.date(),
+            rule,
+            exceptions,
+        )
+        # Rules are matched on calendar days, which is the next day for events
+        # starting before the day start
+        offset = start.date() - self.schedule_day(start)
+        if start.date() > self.last_day + offset or (
+            rule.until and rule.until < self.first_day + offset
+        ):
+            return  # Can't occur in the window
+        self.rules[uid or id(rule)] = (rule, offset)
+
+    def finish(self):
+        # Expands the recurring events and returns (days, issues)
+        day = self.first_day
+        while day <= self.last_day:
+            for uid, (rule, offset) in self.rules.items():
+                if (uid, day + offset) in self.overridden:
+                    continue
+                if rule.occurs_on(day + offset):
+                    self.days.setdefault(day, []).append(rule.event())
+            day += timedelta(days=1)
+        if self.skipped_issues:
+            self.issues.append(
+                ScheduleIssue(
+                    self.filepath, 0, f"{self.skipped_issues} more events skipped"
+                )
+            )
+        return self.days, self.issues
+
+
+def import_ics(lines, first_day, last_day, categories=(), day_start=6, filepath=""):
+    # Reads the VEVENTs of an iterable of lines (e.g. an open file) and returns
+    # the events of the schedule days first_day to last_day, as a dict of day ->
+    # events, and a ScheduleIssue for every event that couldn't be read.
+    # Categories are matched against the known ones, see category_for().
+    calendar = CalendarImport(first_day, last_day, categories, day_start, filepath)
+    properties = None  # Of the VEVENT being read
+    event_line = 0
+    nested = 0  # Depth of the components inside the VEVENT (e.g. VALARM)
+    for number, line in unfolded_lines(lines):
+        if not line:
+            continue
+        # Only BEGIN and END matter outside of the VEVENTs and in the
+        # components nested in them
+        if (properties is None or nested) and not line[:6].upper().startswith(
+            ("BEGIN:", "END:")
+        ):
+            continue
+        try:
+            name, params, value = parse_property(line)
+        except ValueError as error:
+            calendar.add_issue(number, str(error))
+            continue
+
+        if name == "BEGIN":
+            if properties is not None:
+                nested += 1
+            elif value.upper() == "VEVENT":
+                properties = {}
+                event_line = number
+        elif name == "END" and properties is not None:
+            if nested:
+                nested -= 1
+            else:
+                calendar.add_event(event_line, properties)
+                properties = None
+        elif properties is not None and not nested:
+            if name == "EXDATE":
+                properties.setdefault(name, []).append((params, value))
+            else:
+                properties[name] = (params, value)
+    return calendar.finish()
+
+
+def read_ics_file(filepath, first_day, last_day, categories=(), day_start=6):
+    with open(filepath, encoding="utf-8-sig", errors="replace") as file:
+        return import_ics(file, first_day, last_day, categories, day_start, filepath)
@@ -0,0 +1,169 @@
+# Opt-in timing instrumentation: paint and update durations, frames per second
+# and timer lateness per widget. Enabled with CHRONO_COMPASS_INSTRUMENT=1 or
+# the --instrument flag, otherwise every hook returns right away.
+import functools
+import json
+import os
+import time
+from collections import deque
+
+# Number of recent samples kept per metric for percentiles and fps
+RECENT_SAMPLES = 300
+
+
+class Metric:
+    __slots__ = ("count", "total", "max", "last", "recent", "frames")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+        self.frames = deque(maxlen=RECENT_SAMPLES)  # perf_counter() of paints
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+        self.recent.append(value)
+
+    def summary(self, now):
+        recent = sorted(self.recent)
+        result = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+            "p95": recent[int(len(recent) * 0.95)] if recent else 0.0,
+        }
+        if self.frames:
+            # Paints over the last 5 seconds
+            result["fps"] = sum(1 for t in self.frames if now - t <= 5.0) / 5.0
+        return result
+
+
+class Instrumentation:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.durations = {}  # name -> Metric, in ms
+        self.lateness = {}  # timer name -> Metric, in ms
+        self.expected = {}  # timer name -> perf_counter() of the expected tick
+        self.started = time.time()
+
+    def record(self, name, ms, frame=False):
+        metric = self.durations.get(name)
+        if metric is None:
+            metric = self.durations[name] = Metric()
+        metric.add(ms)
+        if frame:
+            metric.frames.append(time.perf_counter())
+
+    def timer_armed(self, name, msecs):
+        # A single shot timer was started, it should fire in msecs
+        if self.enabled:
+            self.expected[name] = time.perf_counter() + msecs / 1000
+
+    def timer_stopped(self, name):
+        # The timer won't fire, so its next tick isn't late whenever it comes
+        self.expected.pop(name, None)
+
+    def timer_fired(self, name):
+        # Records how late a timer fired compared to when it was expected
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        expected = self.expected.pop(name, None)
+        if expected is not None:
+            metric = self.lateness.get(name)
+            if metric is None:
+                metric = self.lateness[name] = Metric()
+            metric.add(max(0.0, (now - expected) * 1000))
+
+    def snapshot(self):
+        now = time.perf_counter()
+        return {
+            "timestamp": time.time(),
+            "uptime_s": time.time() - self.started,
+            "durations_ms": {
+                name: metric.summary(now)
+                for name, metric in sorted(self.durations.items())
+            },
+            "timer_lateness_ms": {
+                name: metric.summary(now)
+                for name, metric in sorted(self.lateness.items())
+            },
+        }
+
+    def dump(self, path):
+        # Written to a temporary file first so readers never see half a file
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.snapshot(), file, indent=2)
+        os.replace(temporary, path)
+
+    def summary_lines(self):
+        # Short human readable report, used by the on-screen overlay
+        now = time.perf_counter()
+        lines = []
+        for name, metric in sorted(self.durations.items()):
+            summary = metric.summary(now)
+            line = f"{name}: {summary['last']:.2f}ms (p95 {summary['p95']:.2f}, max {summary['max']:.2f})"
+            if "fps" in summary:
+                line += f"  {summary['fps']:.1f} fps"
+            lines.append(line)
+        for name, metric in sorted(self.lateness.items()):
+            summary = metric.summary(now)
+            lines.append(
+                f"{name} late: {summary['last']:.1f}ms (p95 {summary['p95']:.1f}, max {summary['max']:.1f})"
+            )
+        return lines
+
+
+class StartupProfile:
+    # Time spent in each startup phase, reported by --profile-startup. A phase
+    # lasts from the previous mark() (or the start) to its own mark().
+    def __init__(self, started):
+        self.started = started  # perf_counter() before the first import
+        self.last = started
+        self.phases = []  # (name, ms)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def add(self, name, ms):
+        # A phase measured elsewhere (e.g. on a worker thread), it overlaps the
+        # others and isn't part of the total
+        self.phases.append((name, ms))
+
+    def report_lines(self):
+        lines = [f"{name:24s}{ms:8.1f}ms" for name, ms in self.phases]
+        lines.append(f"{'total':24s}{(self.last - self.started) * 1000:8.1f}ms")
+        return lines
+
+
+instruments = Instrumentation(
+    os.environ.get("CHRONO_COMPASS_INSTRUMENT", "") not in ("", "0")
+)
+
+
+def instrumented(name, frame=False):
+    # Records the duration of every call of the decorated method under "name".
+    # frame=True also counts the calls for the frames per second.
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not instruments.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                instruments.record(name, (time.perf_counter() - start) * 1000, frame)
+
+        return wrapper
+
+    return decorate
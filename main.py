@@ -1,4 +1,26 @@
+import time
+
+# Taken before anything else is imported, see --profile-startup
+STARTUP_STARTED = time.perf_counter()
+
 import sys
+
+# Status feed for status bars: no window, nor any Qt import (see headless.py)
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    import headless
+
+    sys.exit(headless.main(sys.argv[1:]))
+
+# A second launch hands its arguments over to the running instance and exits
+# before the rest of Qt is loaded (see single_instance.py)
+if __name__ == "__main__" and "--new-instance" not in sys.argv[1:]:
+    import single_instance
+
+    if single_instance.forward_to_running_instance(sys.argv[1:]):
+        sys.exit(0)
+
+import math
+import weakref
 from PyQt6.QtWidgets import (
     QApplication,
     QWidget,
@@ -8,13 +30,67 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QCheckBox,
     QToolTip,
+    QListView,
+    QStyledItemDelegate,
+    QAbstractItemView,
+    QFrame,
+    QLabel,
+    QGridLayout,
+)
+from PyQt6.QtGui import (
+    QPainter,
+    QColor,
+    QFont,
+    QPainterPath,
+    QIcon,
+    QPixmap,
+    QShortcut,
+    QKeySequence,
 )
-from PyQt6.QtGui import QPainter, QPen, QColor, QFont, QPainterPath, QIcon
-from PyQt6.QtCore import Qt, QTimer, QTime, QPointF, QUrl, QRect
-from PyQt6.QtMultimedia import QSoundEffect
-import csv
+from PyQt6.QtCore import (
+    Qt,
+    QTimer,
+    QPointF,
+    QUrl,
+    QRect,
+    QEvent,
+    QSize,
+    QAbstractListModel,
+    QModelIndex,
+    QObject,
+    QFileSystemWatcher,
+    QRunnable,
+    QThreadPool,
+    QRectF,
+    pyqtSignal,
+)
+import argparse
+import os
 from datetime import datetime, timedelta
-import numpy as np
+from instrumentation import instruments, instrumented, StartupProfile
+from event_store import (
+    EventStore,
+    AngularIntervalIndex,
+    assign_lanes,
+    format_event_info,
+    seconds_since_midnight,
+)
+from schedules import (
+    day_start,
+    CATEGORY_COLORS,
+    SCHEDULES_DIR,
+    RECURRENCE_FILE,
+    calendar_paths,
+    schedule_path,
+    displayed_date,
+    update_schedule_cache,
+    load_schedule,
+)
+from tick_scheduler import tick_scheduler, SECOND, MINUTE, TRANSITION
+from theme import Theme
+from session_log import SessionLog
+from pomodoro import PomodoroEngine
+from single_instance import InstanceServer, forward_to_running_instance
 
 APP_STYLE = "Fusion"
 
@@ -37,8 +113,8 @@ elif sys.platform == "win32":
     APP_STYLE = "Windows"
 
 
-# Global "day start" time
-day_start = 6
+# The day start, the categories and where the schedules are read from are set
+# in schedules.py
 
 # Material Design Dark Mode Color Palette
 # Used as the app's color palette
@@ -79,248 +155,586 @@ PIKACHU_COLORS = {
 # Current Palette
 APP_PALETTE = PIKACHU_COLORS
 
-CATEGORY_COLORS = {
-    "Work": "#BB86FC",
-    "Meeting": "#11009E",
-    "Exercise": "#03DAC6",
-    "Food": "#f60e3b",
-    "Duties": "#6527BE",
-    "Other": "#77ACF1",
-    "Sleep": "#000000",
-}
+# Palettes that can be picked with --theme or cycled through with T
+THEMES = {"material": MATERIAL_COLORS, "pikachu": PIKACHU_COLORS}
+
+# Upcoming events panel: "widgets" creates one widget per event, "view" uses a
+# scrollable model/view list that only paints the visible rows and "auto" picks
+# the view when the schedule has more than EVENTS_LIST_VIEW_THRESHOLD events
+EVENTS_LIST_MODE = "auto"
+EVENTS_LIST_VIEW_THRESHOLD = 50
+
+# Pomodoro countdown: "text" or "dot-matrix" (the digits of the clock)
+POMODORO_READOUT_STYLE = "text"
+
+# Every finished Pomodoro session is logged to this SQLite database (see
+# session_log.py). None disables it.
+POMODORO_LOG_FILE = "pomodoro_log.sqlite3"
+
+# Seconds between two dumps of the instrumentation timings (--instrument)
+INSTRUMENTATION_DUMP_INTERVAL = 10
+
+# Non-essential services (schedule hot reload, sound) start right after the
+# first paint, or after this many milliseconds if the window is never painted
+# (e.g. started minimized)
+DEFERRED_STARTUP_TIMEOUT = 2000
+
+# Global event store with the displayed day's events. Shared by every widget.
+# Reads data from the relevant .csv at app start-up and whenever it changes.
+# Its "version" is bumped on every reload so widgets know when to drop caches.
+events = EventStore(day_start)
+
+# Global theme: every palette and category color as ready-made QColor, QPen
+# and QBrush objects. Its "version" is bumped when the palette is switched.
+theme = Theme(APP_PALETTE, CATEGORY_COLORS)
+
+# Icons, only loaded the first time they are needed: the window and button
+# ones after the first paint (see MainWindow.startDeferred)
+icons = {}
 
-# Global variable with event data. Can be accessed by any widget.
-# Reads data from the relevant .csv once at app start-up
-events = []
 
-current_event_color = APP_PALETTE["error"]
+def icon(name):
+    if name not in icons:
+        icons[name] = QIcon(f"_internal/{name}.png")
+    return icons[name]
+
+
+# Events lists (from schedule_files, recurrence_file and calendar_files) shown
+# in "events"
+loaded_schedule = None
+
+
+def apply_schedule(sources):
+    # Shows a loaded schedule (UI thread only) and returns True if the events
+    # changed. The new event set is swapped in with a single assignment.
+    global loaded_schedule
+    if (
+        loaded_schedule is not None
+        and len(loaded_schedule) == len(sources)
+        and all(old is new for old, new in zip(loaded_schedule, sources))
+    ):
+        return False
+
+    events.replace([event for source in sources for event in source])
+    loaded_schedule = sources
+    return True
 
 
 def load_events_from_csv():
-    global events
-    events.clear()
-    now = datetime.now()
+    # Synchronous load of the displayed day, for scripts and benchmarks. The
+    # app uses ScheduleLoader instead.
+    sources, issues = load_schedule(displayed_date())
+    for issue in issues:
+        print(f"Schedule issue: {issue}")
+    if sources is None:
+        return False
+    return apply_schedule(sources)
 
-    # Only consider current day if after 6:00
-    if now.hour < day_start:
-        adjusted_date = now - timedelta(days=1)
-    else:
-        adjusted_date = now
-
-    day_of_week = adjusted_date.weekday()
-    days = [
-        "monday",
-        "tuesday",
-        "wednesday",
-        "thursday",
-        "friday",
-        "saturday",
-        "sunday",
-    ]
-    day_name = days[day_of_week]
-
-    filepath = f"week_schedules/{day_of_week}_{day_name}_schedule.csv"
-
-    with open(filepath, "r") as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip header row
-
-        for row in reader:
-            if not row or not any(row):
-                continue
-
-            if len(row) >= 4:
-                event = {
-                    "name": row[0],
-                    "start_time": datetime.strptime(row[1], "%H:%M").time(),
-                    "end_time": datetime.strptime(row[2], "%H:%M").time(),
-                    "category": row[3],
-                }
-                events.append(event)
-            else:
-                print(f"Row skipped due to insufficient columns: {row}")
+
+class ScheduleLoadSignals(QObject):
+    # Results of ScheduleLoadTask, delivered on the thread of the receiver
+    loaded = pyqtSignal(object, object)  # key, (sources, issues, ms)
+
+
+class ScheduleLoadTask(QRunnable):
+    # Loads the schedule of a day on a QThreadPool thread so the UI never
+    # waits for the disk or the parsing, see load_schedule()
+    def __init__(self, day, key, signals):
+        super().__init__()
+        self.day = day
+        self.key = key
+        self.signals = signals
+
+    def run(self):
+        start = time.perf_counter()
+        sources, issues = load_schedule(self.day)
+        ms = (time.perf_counter() - start) * 1000
+        self.signals.loaded.emit(self.key, (sources, issues, ms))
+
+
+class ScheduleLoader(QObject):
+    # Loads the displayed day on the thread pool and applies the result on
+    # the UI thread. Only the result of the latest load() is used. The next
+    # day is loaded on its own once the day start is reached.
+    scheduleChanged = pyqtSignal()
+    issuesChanged = pyqtSignal(list)  # ScheduleIssue
+    loaded = pyqtSignal(float)  # Milliseconds spent on the worker thread
+    dayChanged = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.signals = ScheduleLoadSignals(self)
+        self.signals.loaded.connect(self.applyResult)
+        self.generation = 0
+        self.issues = []
+        self.day = None  # Displayed date of the latest load()
+        # The day start is always a transition, see EventStore.transitions
+        tick_scheduler().subscribe(self.checkDay, TRANSITION)
+
+    def load(self):
+        self.generation += 1
+        self.day = displayed_date()
+        QThreadPool.globalInstance().start(
+            ScheduleLoadTask(self.day, self.generation, self.signals)
+        )
+
+    def checkDay(self, now):
+        if displayed_date(now.datetime) != self.day:
+            self.load()
+            self.dayChanged.emit()
+
+    def applyResult(self, generation, result):
+        if generation != self.generation:
+            return
+        sources, issues, ms = result
+        if issues != self.issues:
+            for issue in issues:
+                print(f"Schedule issue: {issue}")
+            self.issues = issues
+            self.issuesChanged.emit(issues)
+        # Keep showing the previous schedule until the file is fixed
+        if sources is not None and apply_schedule(sources):
+            self.scheduleChanged.emit()
+        self.loaded.emit(ms)
+        QThreadPool.globalInstance().start(update_schedule_cache)
+
+
+class ScheduleWatcher(QObject):
+    # Watches week_schedules/ and reloads the displayed day when its file
+    # changes, without restarting the app. reloaded is emitted for whatever
+    # else shows schedules (the week overview).
+    reloaded = pyqtSignal()
+
+    def __init__(self, loader, parent=None):
+        super().__init__(parent)
+        self.loader = loader
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPath(SCHEDULES_DIR)
+        self.watchScheduleFiles()
+        self.watcher.fileChanged.connect(self.scheduleReload)
+        # Editors that save by renaming a temporary file replace the watched
+        # file, which only shows up as a change of the directory
+        self.watcher.directoryChanged.connect(self.scheduleReload)
+
+        # Editors often write a file in several steps, wait for them to settle
+        self.reloadTimer = QTimer(self)
+        self.reloadTimer.setSingleShot(True)
+        self.reloadTimer.setInterval(250)
+        self.reloadTimer.timeout.connect(self.reload)
+
+    def watchScheduleFiles(self):
+        watched = set(self.watcher.files())
+        filepaths = [schedule_path(day_of_week) for day_of_week in range(7)]
+        for filepath in filepaths + [RECURRENCE_FILE] + calendar_paths():
+            if filepath not in watched and os.path.exists(filepath):
+                self.watcher.addPath(filepath)
+
+    def scheduleReload(self, path):
+        self.reloadTimer.start()
+
+    def reload(self):
+        self.watchScheduleFiles()
+        self.loader.load()
+        self.reloaded.emit()
+
+
+# Annular sector paths shared by every dial, keyed by the event's start and end
+# time and its lane. They are built once per distinct event and reused across
+# reloads. The dials hold the paths they draw (see eventGeometry() and
+# MiniDial.setEvents()), a path is dropped from here once no dial uses it.
+sector_paths = weakref.WeakValueDictionary()
+
+# Radii of the events ring, in the dial's 250x250 space
+EVENT_RING_INNER = 40
+EVENT_RING_OUTER = 98.5
+
+
+def event_sector_path(event, lane=0, lanes=1):
+    # Concurrent events share the ring as concentric sub-rings, lane 0 being
+    # the outermost, see assign_lanes()
+    start_time_seconds = event.start
+    end_time_seconds = event.end
+    key = (start_time_seconds, end_time_seconds, lane, lanes)
+    path = sector_paths.get(key)
+    if path is not None:
+        return path
+
+    if start_time_seconds > end_time_seconds:
+        end_time_seconds += 86400
+
+    start_angle = 360.0 * start_time_seconds / 86400 - 90
+    span_angle = 360.0 * (end_time_seconds - start_time_seconds) / 86400
+    start_radians = math.radians(start_angle)
+    end_radians = math.radians(start_angle + span_angle)
+
+    # Drawing the sector
+    path = QPainterPath()
+    band = (EVENT_RING_OUTER - EVENT_RING_INNER) / lanes
+    outer_radius = EVENT_RING_OUTER - lane * band
+    inner_radius = outer_radius - band
+
+    # Calculate start and end points for the outer arc
+    start_point_outer = QPointF(
+        outer_radius * math.cos(start_radians), outer_radius * math.sin(start_radians)
+    )
+    end_point_inner = QPointF(
+        inner_radius * math.cos(end_radians), inner_radius * math.sin(end_radians)
+    )
+    start_point_inner = QPointF(
+        inner_radius * math.cos(start_radians), inner_radius * math.sin(start_radians)
+    )
+
+    # Draw the outer arc
+    path.moveTo(start_point_inner)
+    path.lineTo(start_point_outer)
+    path.arcTo(
+        -outer_radius,
+        -outer_radius,
+        2 * outer_radius,
+        2 * outer_radius,
+        -start_angle,
+        -span_angle,
+    )
+    path.lineTo(end_point_inner)
+    path.arcTo(
+        -inner_radius,
+        -inner_radius,
+        2 * inner_radius,
+        2 * inner_radius,
+        -start_angle - span_angle,
+        +span_angle,
+    )
+    path.closeSubpath()
+
+    sector_paths[key] = path
+    return path
+
+
+def event_tooltip(hovered, radius, layout):
+    # The events at the hovered time of day, the one whose sub-ring is under
+    # the mouse first. layout(event) returns its (lane, lanes, overlaps).
+    def underMouse(event):
+        lane, lanes, _ = layout(event)
+        band = (EVENT_RING_OUTER - EVENT_RING_INNER) / lanes
+        return lane == min(int((EVENT_RING_OUTER - radius) / band), lanes - 1)
+
+    lines = []
+    for event in sorted(hovered, key=lambda event: not underMouse(event)):
+        line = f"{event.name} from {event.start_label} to {event.end_label}"
+        if layout(event)[2]:
+            line += " (overlaps another event)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def render_face_layer(width, height, dpr, hour, angle):
+    # The static face of a dial (hour lines, labels and 5 minute ticks),
+    # rotated by angle and with the hours before "hour" dimmed, on a
+    # transparent pixmap of the widget's size
+    rect = min(width, height)
+    pixmap = QPixmap(round(width * dpr), round(height * dpr))
+    pixmap.setDevicePixelRatio(dpr)
+    pixmap.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setRenderHint(QPainter.RenderHint.VerticalSubpixelPositioning)
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+    painter.translate(width / 2, height / 2)
+    painter.scale(rect / 250, rect / 250)
+    painter.rotate(-angle)
+    painter.setFont(QFont("Arial", 4))
+
+    hourColor = theme["on_background"].color
+    hourColorPast = theme["on_background"].dimmed
+    hourPen = theme["on_background"].pen(0.5)
+    hourPenPast = theme["on_background"].pen(0.5, dimmed=True)
+    tickPen = theme["primary"].pen(0.65)
+    tickPenPast = theme["primary"].pen(0.65, dimmed=True)
+
+    # Draw 24-hour clock face
+    for i in range(24):
+        is_past = (i < hour and i > day_start) or (
+            hour < day_start and (i > day_start or i < hour)
+        )
+        # Hour lines
+        painter.setPen(hourPenPast if is_past else hourPen)
+        painter.drawLine(0, -98, 0, -88)
+        # Draw hour labels
+        painter.setPen(hourColorPast if is_past else hourColor)
+        text = str(i)
+        hour_srt_rect = painter.fontMetrics().boundingRect(text)
+        painter.drawText(
+            round(-hour_srt_rect.width() / 2),
+            round(-98 + hour_srt_rect.height() - 10),
+            text,
+        )
+
+        painter.rotate(15.0)  # 360 degrees / 24 segments
+
+    # Draw minute ticks for every 5 minutes
+    for i in range(24 * 12):  # 12 five-minute segments per hour
+        if i % 12 != 0:  # Skip hours, already drawn
+            is_past = (i < hour * 12 and i > day_start * 12) or (
+                hour < day_start and (i > day_start * 12 or i < hour * 12)
+            )
+            painter.setPen(tickPenPast if is_past else tickPen)
+            painter.drawLine(0, -98, 0, -92)
+        painter.rotate(1.25)  # 360 degrees / (24 hours * 12 segments)
+
+    painter.end()
+    return pixmap
+
+
+# The 3x5 dot-matrix digits 0 to 9, one string per row
+DOT_MATRIX_DIGITS = (
+    ("###", "#.#", "#.#", "#.#", "###"),
+    ("..#", ".##", "..#", "..#", "..#"),
+    ("###", "..#", ".#.", "#..", "###"),
+    ("###", "..#", ".##", "..#", "###"),
+    ("#.#", "#.#", "###", "..#", "..#"),
+    ("###", "#..", "###", "..#", "###"),
+    ("###", "#..", "###", "#.#", "###"),
+    ("###", "..#", ".##", "..#", "..#"),
+    ("###", "#.#", "###", "#.#", "###"),
+    ("###", "#.#", "###", "..#", "###"),
+)
+# Glyphs of the atlas as (x, y, dot size) in dial units: digits on a 3 unit
+# grid and the colon last
+DOT_MATRIX_GLYPHS = tuple(
+    tuple(
+        (column * 3, row * 3, 2)
+        for row, line in enumerate(rows)
+        for column, dot in enumerate(line)
+        if dot == "#"
+    )
+    for rows in DOT_MATRIX_DIGITS
+) + (((0, 3, 1), (0, 10, 1)),)
+# x of each character of a "12:34" readout, in dial units
+DOT_MATRIX_OFFSETS = (0, 12, 25, 29, 42)
+DOT_MATRIX_WIDTH = 51  # Of a whole readout, in dial units
+
+
+class DotMatrixAtlas:
+    # The dot-matrix digits and colon rendered once into a single pixmap for a
+    # scale, device pixel ratio and color. A readout is then a few pixmap blits
+    # at whole device pixels instead of dozens of antialiased ellipses.
+    def __init__(self, scale, dpr, color):
+        self.scale = scale
+        self.dpr = dpr
+        self.pad = math.ceil(scale * dpr)  # Device pixels around each glyph
+        self.cellWidth = math.ceil(9 * scale * dpr) + 2 * self.pad
+        self.cellHeight = math.ceil(15 * scale * dpr) + 2 * self.pad
+
+        self.pixmap = QPixmap(self.cellWidth * len(DOT_MATRIX_GLYPHS), self.cellHeight)
+        self.pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(self.pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QColor(color))
+        painter.setBrush(QColor(color))
+        for i, glyph in enumerate(DOT_MATRIX_GLYPHS):
+            painter.resetTransform()
+            painter.translate(i * self.cellWidth + self.pad, self.pad)
+            painter.scale(scale * dpr, scale * dpr)
+            for x, y, size in glyph:
+                painter.drawEllipse(x, y, size, size)
+        painter.end()
+        self.pixmap.setDevicePixelRatio(dpr)
+
+    def draw(self, painter, x, y, text, offsets=DOT_MATRIX_OFFSETS):
+        # Draws text (digits and colons) with its top left corner at x, y in
+        # the painter's (unscaled) coordinates
+        for char, offset in zip(text, offsets):
+            glyph = 10 if char == ":" else int(char)
+            left = round((x + offset * self.scale) * self.dpr) - self.pad
+            top = round(y * self.dpr) - self.pad
+            painter.drawPixmap(
+                QPointF(left / self.dpr, top / self.dpr),
+                self.pixmap,
+                QRectF(glyph * self.cellWidth, 0, self.cellWidth, self.cellHeight),
+            )
+
+
+# Atlases keyed by scale, device pixel ratio and color, shared by the clock
+# and the Pomodoro readout
+dot_matrix_atlases = {}
+
+
+def dot_matrix_atlas(scale, dpr, color):
+    key = (scale, dpr, color)
+    if key not in dot_matrix_atlases:
+        if len(dot_matrix_atlases) > 8:
+            dot_matrix_atlases.clear()  # Old sizes
+        dot_matrix_atlases[key] = DotMatrixAtlas(scale, dpr, color)
+    return dot_matrix_atlases[key]
 
 
 class DarkModeRotating24hClock(QWidget):
     def __init__(self):
         super().__init__()
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update)
-        self.timer.start(1000)
+        tick_scheduler().subscribe(self.tick, SECOND)
         self.setMouseTracking(True)
         self.setMinimumSize(800, 800)
 
+        # Cached static clock face, see faceLayer()
+        self.faceCache = None
+        self.faceCacheKey = None
+
+        # Cached digital readout, see readoutLayer()
+        self.readoutCache = None
+        self.readoutCacheKey = None
+
+        # Cached event sectors, see eventGeometry()
+        self.eventGeometryCache = []
+        self.eventGeometryVersion = None
+
+        # (snapped angle, minute) of the last paint, see tick()
+        self.paintedKey = None
+
+    def tick(self, now):
+        # The dial turns far less than a pixel per second, so most ticks change
+        # nothing visible. Only repaint when the snapped rotation or the minute
+        # (digital readout, past events and hours) changed.
+        rect = min(self.width(), self.height())
+        if (self.dialAngle(now, rect), now.minute) != self.paintedKey:
+            self.update()
+
     def mouseMoveEvent(self, mouseEvent):
         # Calculate mouse position relative to the center
         center = QPointF(self.width() / 2, self.height() / 2)
         mousePos = mouseEvent.position() - center
-        mouseAngle = np.degrees(np.arctan2(mousePos.y(), mousePos.x())) % 360
-        mouseRadius = np.sqrt(mousePos.x() ** 2 + mousePos.y() ** 2)
-        show_tooltip = False
-
-        currentTime = QTime.currentTime()
-        totalSeconds = (
-            currentTime.hour() * 3600 + currentTime.minute() * 60 + currentTime.second()
+        mouseAngle = math.degrees(math.atan2(mousePos.y(), mousePos.x())) % 360
+        # Same radii as the event sectors, in the 250x250 dial space
+        mouseRadius = (
+            math.hypot(mousePos.x(), mousePos.y())
+            * 250
+            / min(self.width(), self.height())
         )
 
-        # Calculate angle, considering 24h format (86400 seconds in a day)
-        clock_angle = 360.0 * totalSeconds / 86400
+        totalSeconds = int(tick_scheduler().now.seconds)
 
         QToolTip.hideText()
 
         # Determine if the mouse is within the clock's event display area
-        if 120 <= mouseRadius <= 300:
-            for event in events:
-                start_time_seconds = (
-                    event["start_time"].hour * 3600 + event["start_time"].minute * 60
+        if EVENT_RING_INNER <= mouseRadius <= EVENT_RING_OUTER:
+            # Undo the dial rotation (top of the dial is "now") to get the time
+            # of day under the mouse, 240 seconds per degree
+            mouseSeconds = ((mouseAngle + 90) % 360) * 240 + totalSeconds
+            hovered = events.at_seconds(mouseSeconds)
+            if hovered:
+                QToolTip.showText(
+                    mouseEvent.globalPosition().toPoint(),
+                    event_tooltip(hovered, mouseRadius, events.layout),
                 )
-                end_time_seconds = (
-                    event["end_time"].hour * 3600 + event["end_time"].minute * 60
+
+    def resizeEvent(self, event):
+        self.faceCache = None
+        self.readoutCache = None
+        super().resizeEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.PaletteChange:
+            self.faceCache = None
+            self.readoutCache = None
+        super().changeEvent(event)
+
+    def dialAngle(self, now, rect):
+        # Calculate angle, considering 24h format (86400 seconds in a day)
+        return self.snapAngle(360.0 * int(now.seconds) / 86400, rect)
+
+    def snapAngle(self, angle, rect):
+        # The dial turns 0.0042 degrees per second, far less than a pixel.
+        # Snap the rotation to the largest step that moves the outer edge by
+        # less than half a device pixel so the cached face stays valid for a
+        # while and can be blitted without a (costly) rotated transform.
+        outer_radius_px = rect / 250 * 98.5 * self.devicePixelRatioF()
+        step = math.degrees(0.5 / outer_radius_px)
+        return math.floor(angle / step) * step
+
+    def faceLayer(self, rect, hour, angle):
+        # The static face (hour lines, labels and 5 minute ticks) only changes
+        # with the widget size, the theme, the snapped rotation or when
+        # another hour becomes "past". It is rendered once at the widget size
+        # and then blitted as is on every tick.
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr, hour, angle, theme.version)
+        if self.faceCache is not None and self.faceCacheKey == key:
+            return self.faceCache
+
+        self.faceCache = render_face_layer(
+            self.width(), self.height(), dpr, hour, angle
+        )
+        self.faceCacheKey = key
+        return self.faceCache
+
+    def eventGeometry(self):
+        # Rebuilt only when a new schedule has been loaded. The paths live in
+        # the dial's 250x250 logical space, so resizing only changes the
+        # painter scale and never invalidates them. The category brushes don't
+        # depend on the palette, switching it doesn't invalidate them either.
+        if self.eventGeometryVersion != events.version:
+            self.eventGeometryCache = [
+                (
+                    event,
+                    event_sector_path(event, lane, lanes),
+                    theme.category(event).translucentBrush,
+                    theme.category(event).translucentDimmedBrush,
+                    overlaps,
+                )
+                for event, lane, lanes, overlaps in zip(
+                    events, events.lanes, events.lane_counts, events.conflicts
                 )
-                start_angle = 360.0 * start_time_seconds / 86400
-                end_angle = 360.0 * end_time_seconds / 86400
-
-                # Adjust for full rotation
-                if start_angle > end_angle:
-                    end_angle += 360
-
-                # Convert angles to match clock drawing if necessary
-                start_angle_clock = (start_angle - 90 - clock_angle) % 360
-                end_angle_clock = (end_angle - 90 - clock_angle) % 360
-                if start_angle_clock > end_angle_clock:
-                    if mouseAngle >= start_angle_clock or mouseAngle <= end_angle_clock:
-                        show_tooltip = True
-                else:
-                    if start_angle_clock <= mouseAngle <= end_angle_clock:
-                        show_tooltip = True
-
-                if show_tooltip:
-                    event_info = f"{event['name']} from {event['start_time'].strftime('%H:%M')} to {event['end_time'].strftime('%H:%M')}"
-                    QToolTip.showText(mouseEvent.globalPosition().toPoint(), event_info)
-                    break
-
-    def drawDot(self, painter, x, y, size=5):
-        painter.drawEllipse(x, y, size, size)
-
-    def drawNumber(self, painter, num, topLeftX, topLeftY):
-        # Mapping of number to dot positions for a 3x5 grid.
-        numberMap = {
-            "0": [
-                (0, 0),
-                (0, 1),
-                (0, 2),
-                (0, 3),
-                (0, 4),
-                (1, 0),
-                (1, 4),
-                (2, 0),
-                (2, 1),
-                (2, 2),
-                (2, 3),
-                (2, 4),
-            ],
-            "1": [(1, 1), (2, 0), (2, 1), (2, 2), (2, 3), (2, 4)],
-            "2": [
-                (0, 0),
-                (1, 0),
-                (2, 0),
-                (2, 1),
-                (1, 2),
-                (0, 3),
-                (0, 4),
-                (1, 4),
-                (2, 4),
-            ],
-            "3": [
-                (0, 0),
-                (1, 0),
-                (2, 0),
-                (2, 1),
-                (1, 2),
-                (2, 3),
-                (0, 4),
-                (1, 4),
-                (2, 4),
-                (2, 2),
-            ],
-            "4": [
-                (0, 0),
-                (0, 1),
-                (0, 2),
-                (1, 2),
-                (2, 0),
-                (2, 1),
-                (2, 2),
-                (2, 3),
-                (2, 4),
-            ],
-            "5": [
-                (0, 0),
-                (1, 0),
-                (2, 0),
-                (0, 1),
-                (0, 2),
-                (1, 2),
-                (2, 2),
-                (2, 3),
-                (0, 4),
-                (1, 4),
-                (2, 4),
-            ],
-            "6": [
-                (0, 0),
-                (0, 1),
-                (0, 2),
-                (0, 3),
-                (0, 4),
-                (1, 0),
-                (1, 2),
-                (1, 4),
-                (2, 0),
-                (2, 2),
-                (2, 3),
-                (2, 4),
-            ],
-            "7": [(0, 0), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2), (2, 3), (2, 4)],
-            "8": [
-                (0, 0),
-                (0, 1),
-                (0, 2),
-                (0, 3),
-                (0, 4),
-                (1, 0),
-                (1, 2),
-                (1, 4),
-                (2, 1),
-                (2, 2),
-                (2, 3),
-                (2, 0),
-                (2, 4),
-            ],
-            "9": [
-                (0, 0),
-                (0, 1),
-                (0, 2),
-                (0, 4),
-                (1, 0),
-                (1, 2),
-                (1, 4),
-                (2, 0),
-                (2, 1),
-                (2, 2),
-                (2, 3),
-                (2, 4),
-            ],
-        }
-
-        for digit, positions in numberMap.items():
-            if num == int(digit):
-                for pos in positions:
-                    # Adjusted for size and spacing
-                    self.drawDot(
-                        painter, topLeftX + pos[0] * 3, topLeftY + pos[1] * 3, 2
-                    )
+            ]
+            self.eventGeometryVersion = events.version
+        return self.eventGeometryCache
+
+    def readoutLayer(self, rect, hour, minute):
+        # The disc with the dot-matrix time, rendered once per minute (and
+        # size or theme) into a small pixmap aligned on device pixels
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr, hour, minute, theme.version)
+        if self.readoutCache is not None and self.readoutCacheKey == key:
+            return self.readoutCache
+
+        scale = rect / 250
+        radius = 39 * scale  # The disc and its antialiased edge
+        left = math.floor((self.width() / 2 - radius) * dpr) / dpr
+        top = math.floor((self.height() / 2 - radius) * dpr) / dpr
+        size = math.ceil(2 * radius * dpr) + 2
+        pixmap = QPixmap(size, size)
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        centerX = self.width() / 2 - left
+        centerY = self.height() / 2 - top
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.translate(centerX, centerY)
+        painter.scale(scale, scale)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(theme["secondary"].brush)
+        painter.drawEllipse(-38, -38, 76, 76)
+        painter.resetTransform()
 
+        # Calculate starting positions for digits
+        baseX = -25
+        if (hour // 10) == 1:
+            baseX = -27
+        baseY = -7
+        atlas = dot_matrix_atlas(scale, dpr, theme.palette["on_primary"])
+        atlas.draw(
+            painter,
+            centerX + baseX * scale,
+            centerY + baseY * scale,
+            f"{hour:02d}:{minute:02d}",
+        )
+        painter.end()
+
+        self.readoutCache = (pixmap, QPointF(left, top))
+        self.readoutCacheKey = key
+        return self.readoutCache
+
+    @instrumented("DarkModeRotating24hClock.paintEvent", frame=True)
     def paintEvent(self, event):
         rect = min(self.width(), self.height())
 
@@ -336,160 +750,41 @@ class DarkModeRotating24hClock(QWidget):
         # Adjust scale based on new geometry
         painter.scale(rect / 250, rect / 250)
 
-        # Get current time
-        currentTime = QTime.currentTime()
-        hour = currentTime.hour()
-        minute = currentTime.minute()
-        totalSeconds = (
-            currentTime.hour() * 3600 + currentTime.minute() * 60 + currentTime.second()
-        )
+        # Get current time, the same snapshot as every other widget
+        now = tick_scheduler().now
+        hour = now.datetime.hour
+        minute = now.datetime.minute
+        totalSeconds = int(now.seconds)
 
-        # Calculate angle, considering 24h format (86400 seconds in a day)
-        angle = 360.0 * totalSeconds / 86400
+        angle = self.dialAngle(now, rect)
+        self.paintedKey = (angle, now.minute)
 
         # Rotate the clock face
         painter.rotate(-angle)
 
-        font = QFont("Arial", 4)
-        painter.setFont(font)
-
-        # Draw events
-        for event in events:
-            start_time_seconds = (
-                event["start_time"].hour * 3600 + event["start_time"].minute * 60
-            )
-            end_time_seconds = (
-                event["end_time"].hour * 3600 + event["end_time"].minute * 60
-            )
-            if start_time_seconds > end_time_seconds:
-                end_time_seconds += 86400
-
-            start_angle = 360.0 * start_time_seconds / 86400 - 90
-            span_angle = 360.0 * (end_time_seconds - start_time_seconds) / 86400
-
-            color = CATEGORY_COLORS.get(event["category"], CATEGORY_COLORS["Other"])
-
+        # Draw events. Their sector paths and brushes are cached, the only
+        # per-tick work is picking the normal or the past-dimmed brush.
+        painter.setPen(Qt.PenStyle.NoPen)
+        geometry = self.eventGeometry()
+        past = events.state_at(totalSeconds).past
+        for (event, path, brush, past_brush, overlaps), is_past in zip(geometry, past):
             # Check if event is in the past
-            now = datetime.now().time()
-            if event["end_time"] < now and (
-                event["end_time"].hour >= day_start or now.hour < day_start
-            ):
-                color = QColor(color).darker(250).name()
-            alpha = 128  # 0 to 255, where 255 is fully opaque
-            transparent_color = QColor(color)
-            transparent_color.setAlpha(alpha)
-
-            # Drawing the sector
-            path = QPainterPath()
-            inner_radius = 40
-            outer_radius = 98.5
-
-            # Calculate start and end points for the outer arc
-            start_point_outer = QPointF(
-                outer_radius * np.cos(np.radians(start_angle)),
-                outer_radius * np.sin(np.radians(start_angle)),
-            )
-            end_point_outer = QPointF(
-                outer_radius * np.cos(np.radians(start_angle + span_angle)),
-                outer_radius * np.sin(np.radians(start_angle + span_angle)),
-            )
-            start_point_inner = QPointF(
-                inner_radius * np.cos(np.radians(start_angle)),
-                inner_radius * np.sin(np.radians(start_angle)),
-            )
-            end_point_inner = QPointF(
-                inner_radius * np.cos(np.radians(start_angle + span_angle)),
-                inner_radius * np.sin(np.radians(start_angle + span_angle)),
-            )
-
-            # Draw the outer arc
-            path.moveTo(start_point_inner)
-            path.lineTo(start_point_outer)
-            path.arcTo(
-                -outer_radius,
-                -outer_radius,
-                2 * outer_radius,
-                2 * outer_radius,
-                -start_angle,
-                -span_angle,
-            )
-            path.lineTo(end_point_inner)
-            path.arcTo(
-                -inner_radius,
-                -inner_radius,
-                2 * inner_radius,
-                2 * inner_radius,
-                -start_angle - span_angle,
-                +span_angle,
-            )
-            path.closeSubpath()
-
-            painter.save()  # Save the painter's state
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.setBrush(QColor(transparent_color))
-            painter.drawPath(path)
-            painter.restore()  # Restore the painter's state after drawing the event
-
-        # Draw 24-hour clock face
-        for i in range(24):
-            # Hour lines
-            if (i < hour and i > day_start) or (
-                hour < day_start and (i > day_start or i < hour)
-            ):
-                painter.setPen(
-                    QPen(
-                        QColor(APP_PALETTE["on_background"]).darker(250),
-                        0.5,
-                        Qt.PenStyle.SolidLine,
-                    )
-                )
-            else:
-                painter.setPen(
-                    QPen(
-                        QColor(APP_PALETTE["on_background"]), 0.5, Qt.PenStyle.SolidLine
-                    )
-                )
-            painter.drawLine(0, -98, 0, -88)
-            # Draw hour labels
-            # Set text color to blue
-            if (i < hour and i > day_start) or (
-                hour < day_start and (i > day_start or i < hour)
-            ):
-                painter.setPen(QColor(APP_PALETTE["on_background"]).darker(250))
-
+            if is_past:
+                painter.setBrush(past_brush)
             else:
-                painter.setPen(QColor(APP_PALETTE["on_background"]))
-
-            text = str(i)
-            hour_srt_rect = painter.fontMetrics().boundingRect(text)
-            painter.drawText(
-                round(-hour_srt_rect.width() / 2),
-                round(-98 + hour_srt_rect.height() - 10),
-                text,
-            )
-
-            painter.rotate(15.0)  # 360 degrees / 24 segments
+                painter.setBrush(brush)
+            painter.drawPath(path)
 
-        # Draw minute ticks for every 5 minutes
+        # Outline the events that overlap another one
+        painter.setPen(theme["error"].pen(0.8))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for event, path, brush, past_brush, overlaps in geometry:
+            if overlaps:
+                painter.drawPath(path)
 
-        for i in range(24 * 12):  # 12 five-minute segments per hour
-            if (i < hour * 12 and i > day_start * 12) or (
-                hour < day_start and (i > day_start * 12 or i < hour * 12)
-            ):
-                painter.setPen(
-                    QPen(
-                        QColor(APP_PALETTE["primary"]).darker(250),
-                        0.65,
-                        Qt.PenStyle.SolidLine,
-                    )
-                )
-            else:
-                painter.setPen(
-                    QPen(QColor(APP_PALETTE["primary"]), 0.65, Qt.PenStyle.SolidLine)
-                )
-            if i % 12 != 0:  # Skip hours, already drawn
-                painter.drawLine(0, -98, 0, -92)
-            painter.rotate(1.25)  # 360 degrees / (24 hours * 12 segments)
+        # Draw 24-hour clock face from the cached layer
+        painter.resetTransform()
+        painter.drawPixmap(0, 0, self.faceLayer(rect, hour, angle))
 
         # Reset rotation for drawing the fixed time indicator
         painter.resetTransform()
@@ -497,35 +792,83 @@ class DarkModeRotating24hClock(QWidget):
         painter.scale(rect / 250, rect / 250)
 
         # Draw current time indicator (static vertical line)
-        painter.setPen(QPen(QColor(APP_PALETTE["secondary"]), 1, Qt.PenStyle.SolidLine))
+        painter.setPen(theme["secondary"].pen(1))
         painter.drawLine(0, -5, 0, -100)  # Static line indicating current time
 
-        # Display the digital clock at the center
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.setBrush(QColor(APP_PALETTE["secondary"]))
-        painter.drawEllipse(-38, -38, 76, 76)
-
-        # Calculate starting positions for digits
-        baseX = -25
-        if (hour // 10) == 1:
-            baseX = -27
-        baseY = -7
-
-        painter.setPen(QColor(APP_PALETTE["on_primary"]))
-        painter.setBrush(QColor(APP_PALETTE["on_primary"]))
-
-        # Draw hour digits
-        self.drawNumber(painter, hour // 10, baseX, baseY)
-        self.drawNumber(painter, hour % 10, baseX + 12, baseY)  # Shift for next digit
-
-        # Draw colon
-        self.drawDot(painter, baseX + 25, baseY + 3, 1)  # Top dot of the colon
-        # Bottom dot of the colon
-        self.drawDot(painter, baseX + 25, baseY + 10, 1)
-
-        # Draw minute digits
-        self.drawNumber(painter, minute // 10, baseX + 29, baseY)
-        self.drawNumber(painter, minute % 10, baseX + 42, baseY)  # Shift for next digit
+        # Display the digital clock at the center, from the cached layer
+        painter.resetTransform()
+        readout, origin = self.readoutLayer(rect, hour, minute)
+        painter.drawPixmap(origin, readout)
+
+
+def paint_event_row(painter, rect, event, event_info, is_current_event):
+    # Shared by CustomEventWidget and EventItemDelegate so both list modes look
+    # exactly the same
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setRenderHint(QPainter.RenderHint.VerticalSubpixelPositioning)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+    painter.setRenderHint(QPainter.RenderHint.NonCosmeticBrushPatterns)
+
+    # Draw the background rectangle with rounded corners
+    if is_current_event:
+        painter.setBrush(theme["error"].brush)
+    else:
+        painter.setBrush(theme["background"].brush)
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.drawRoundedRect(rect, 10, 10)
+
+    # Draw the category color square
+    painter.setBrush(theme.category(event).brush)
+    squareSize = 20
+    squareRect = QRect(
+        rect.left() + 10,
+        rect.top() + round((rect.height() - squareSize) / 2),
+        squareSize,
+        squareSize,
+    )
+    painter.drawRoundedRect(squareRect, 5, 5)
+
+    # Draw the first letter of the category
+    painter.setPen(theme["on_primary"].color)
+    painter.setFont(QFont("Arial", 10))
+    categoryLetter = event.category[0].upper()
+    painter.drawText(squareRect, Qt.AlignmentFlag.AlignCenter, categoryLetter)
+
+    # Draw the event info text
+    textStart = 10 + squareSize + 10  # Start after the square and some padding
+    painter.setPen(theme["primary"].color)
+    painter.drawText(
+        rect.left() + textStart,
+        rect.top(),
+        rect.width() - textStart,
+        rect.height(),
+        Qt.AlignmentFlag.AlignVCenter,
+        event_info,
+    )
+
+
+def event_list_rows(now):
+    # Returns the (event, info text, is current) rows of the events that are
+    # still to come. Which events these are only changes at transitions (see
+    # EventStore.state_at()), in between only the countdowns are updated.
+    nowSeconds = int(seconds_since_midnight(now))
+    state = events.state_at(nowSeconds)
+    rows = []
+    for event in state.pending:
+        is_current_event = id(event) in state.current_ids
+        event_info = format_event_info(event, nowSeconds, is_current_event)
+        rows.append((event, event_info, is_current_event))
+    return rows
+
+
+def current_event_swatch(seconds):
+    # Theme swatch of the (last, in day order) event happening at a time of
+    # day, the palette's error one when there is none
+    state = events.state_at(seconds)
+    if state.current:
+        return theme.category(state.current[-1])
+    return theme["error"]
 
 
 class CustomEventWidget(QWidget):
@@ -536,53 +879,18 @@ class CustomEventWidget(QWidget):
         self.is_current_event = is_current_event
         self.setFixedSize(350, 30)
 
+    def setEventInfo(self, event_info, is_current_event):
+        # Only repaint when the text or the current/past state actually changed
+        if event_info != self.event_info or is_current_event != self.is_current_event:
+            self.event_info = event_info
+            self.is_current_event = is_current_event
+            self.update()
+
+    @instrumented("EventsList.rowPaint")
     def paintEvent(self, event):
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setRenderHint(QPainter.RenderHint.VerticalSubpixelPositioning)
-        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
-        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
-        painter.setRenderHint(QPainter.RenderHint.NonCosmeticBrushPatterns)
-
-        # Draw the background rectangle with rounded corners
-        rect = self.rect()
-        backgroundColor = QColor(APP_PALETTE["background"])
-        if self.is_current_event:
-            backgroundColor = QColor(APP_PALETTE["error"])
-        painter.setBrush(QColor(backgroundColor))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawRoundedRect(rect, 10, 10)
-
-        # Draw the category color square
-        categoryColor = QColor(
-            CATEGORY_COLORS.get(self.event["category"], CATEGORY_COLORS["Other"])
-        )
-        painter.setBrush(categoryColor)
-        squareSize = 20
-        painter.drawRoundedRect(
-            10, round((rect.height() - squareSize) / 2), squareSize, squareSize, 5, 5
-        )
-
-        # Draw the first letter of the category
-        painter.setPen(QColor(APP_PALETTE["on_primary"]))
-        painter.setFont(QFont("Arial", 10))
-        categoryLetter = self.event["category"][0].upper()
-        painter.drawText(
-            QRect(10, round((rect.height() - squareSize) / 2), squareSize, squareSize),
-            Qt.AlignmentFlag.AlignCenter,
-            categoryLetter,
-        )
-
-        # Draw the event info text
-        textStart = 10 + squareSize + 10  # Start after the square and some padding
-        painter.setPen(QColor(APP_PALETTE["primary"]))
-        painter.drawText(
-            textStart,
-            0,
-            rect.width() - textStart,
-            rect.height(),
-            Qt.AlignmentFlag.AlignVCenter,
-            self.event_info,
+        paint_event_row(
+            painter, self.rect(), self.event, self.event_info, self.is_current_event
         )
 
 
@@ -590,94 +898,179 @@ class EventsListWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout(self)
-        self.updateEventsList()
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.updateEventsList)
-        self.timer.start(1000)
+        self.layout.addStretch()  # Add stretch to push all widgets towards the top
 
-    def updateEventsList(self):
-        global current_event_color
+        # Persistent rows keyed by event, kept in display order in the layout
+        self.rows = {}
+        # (events.version, minute) the rows were last computed for
+        self.lastUpdateKey = None
 
-        # Clear existing widgets in the layout
-        for i in reversed(range(self.layout.count())):
-            layoutItem = self.layout.itemAt(i)
-            if layoutItem.widget():
-                layoutItem.widget().deleteLater()
+        self.updateEventsList()
+        tick_scheduler().subscribe(self.updateEventsList, MINUTE)
+
+    @instrumented("EventsListWidget.updateEventsList")
+    def updateEventsList(self, now=None):
+        now = (now or tick_scheduler().now).datetime
+
+        # Event times have minute resolution, so both the countdowns and the
+        # current/past state can only change when the minute changes
+        updateKey = (events.version, now.replace(second=0, microsecond=0))
+        if updateKey == self.lastUpdateKey:
+            return
+
+        if self.lastUpdateKey is None or self.lastUpdateKey[0] != events.version:
+            # New schedule, drop every row
+            for row in self.rows.values():
+                self.layout.removeWidget(row)
+                row.deleteLater()
+            self.rows = {}
+        self.lastUpdateKey = updateKey
+
+        visibleEvents = event_list_rows(now)
+
+        # Remove the rows of events that are over
+        visibleKeys = {id(event) for event, _, _ in visibleEvents}
+        for key in [key for key in self.rows if key not in visibleKeys]:
+            row = self.rows.pop(key)
+            self.layout.removeWidget(row)
+            row.deleteLater()
+
+        # Update the remaining rows in place and insert the ones that appeared.
+        # The visible events are a subsequence of the ordered events, so the
+        # position in that list is also the position in the layout.
+        for position, (event, event_info, is_current_event) in enumerate(visibleEvents):
+            row = self.rows.get(id(event))
+            if row is None:
+                row = CustomEventWidget(event, event_info, is_current_event)
+                self.layout.insertWidget(position, row)
+                self.rows[id(event)] = row
             else:
-                self.layout.removeItem(layoutItem)
+                row.setEventInfo(event_info, is_current_event)
 
-        # Sort events by start time before displaying
-        sorted_events = sorted(
-            events,
-            key=lambda x: (
-                (
-                    x["start_time"].hour + 24
-                    if 0 <= x["start_time"].hour < 6
-                    else x["start_time"].hour
-                ),
-                x["start_time"].minute,
-            ),
-        )
 
-        # Reset current event color to defualt. If there is an occuring event the for loop bellow changes it again.
-        current_event_color = APP_PALETTE["error"]
-
-        now = datetime.now()
-        for event in sorted_events:
-            is_current_event = False
-            event_start = datetime.combine(now.date(), event["start_time"])
-            event_end = datetime.combine(now.date(), event["end_time"])
-            if (event_start < now < event_end) or (
-                event_start < now
-                and now > event_end
-                and event["end_time"].hour < day_start
-                and event_start > event_end
-            ):
-                is_current_event = True
-                current_event_color = CATEGORY_COLORS.get(
-                    event["category"], CATEGORY_COLORS["Other"]
-                )
-                time_to_event = f"{((event_end - now).seconds // 3600):02d}h{(((event_end - now).seconds % 3600) // 60):02d}m left"
-            elif now < event_start or (
-                now > event_start
-                and event["start_time"].hour < day_start
-                and now.hour > day_start
-            ):
-                time_to_event = f"T - {((event_start - now).seconds // 3600):02d}h{(((event_start - now).seconds % 3600) // 60):02d}m"
+class EventsListModel(QAbstractListModel):
+    # Model over the upcoming events, one row per (event, info, is current)
+    EventRole = Qt.ItemDataRole.UserRole
+    IsCurrentRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.eventRows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.eventRows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        event, event_info, is_current_event = self.eventRows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return event_info
+        if role == self.EventRole:
+            return event
+        if role == self.IsCurrentRole:
+            return is_current_event
+        return None
+
+    def setEventRows(self, rows, reset=False):
+        if reset:
+            self.beginResetModel()
+            self.eventRows = rows
+            self.endResetModel()
+            return
+
+        # Remove the rows of events that are over, from the bottom up
+        newKeys = {id(event) for event, _, _ in rows}
+        for position in reversed(range(len(self.eventRows))):
+            if id(self.eventRows[position][0]) not in newKeys:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self.eventRows[position]
+                self.endRemoveRows()
+
+        # Insert new rows and signal only the rows whose content changed. As
+        # in EventsListWidget, the new rows are a subsequence of the ordered
+        # events so positions line up.
+        for position, row in enumerate(rows):
+            if position < len(self.eventRows) and self.eventRows[position][0] is row[0]:
+                if self.eventRows[position] != row:
+                    self.eventRows[position] = row
+                    index = self.index(position)
+                    self.dataChanged.emit(index, index)
             else:
-                continue  # Skip past events
+                self.beginInsertRows(QModelIndex(), position, position)
+                self.eventRows.insert(position, row)
+                self.endInsertRows()
+
+
+class EventItemDelegate(QStyledItemDelegate):
+    @instrumented("EventsList.rowPaint")
+    def paint(self, painter, option, index):
+        painter.save()
+        paint_event_row(
+            painter,
+            option.rect,
+            index.data(EventsListModel.EventRole),
+            index.data(Qt.ItemDataRole.DisplayRole),
+            index.data(EventsListModel.IsCurrentRole),
+        )
+        painter.restore()
 
-            event_info = f"{event['start_time'].strftime('%H:%M')} - {event['end_time'].strftime('%H:%M')}  |  {time_to_event}  |  {event['name']}"
+    def sizeHint(self, option, index):
+        return QSize(350, 30)
 
-            customEventWidget = CustomEventWidget(event, event_info, is_current_event)
-            self.layout.addWidget(customEventWidget)
-        self.layout.addStretch()  # Add stretch to push all widgets towards the top
+
+class EventsListView(QListView):
+    # Model/view alternative to EventsListWidget for large schedules: rows are
+    # painted by a delegate and only the visible ones are ever drawn
+    def __init__(self):
+        super().__init__()
+        self.eventsModel = EventsListModel(self)
+        self.setModel(self.eventsModel)
+        self.setItemDelegate(EventItemDelegate(self))
+        self.setUniformItemSizes(True)
+        self.setSpacing(3)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+
+        # (events.version, minute) the rows were last computed for
+        self.lastUpdateKey = None
+
+        self.updateEventsList()
+        tick_scheduler().subscribe(self.updateEventsList, MINUTE)
+
+    @instrumented("EventsListView.updateEventsList")
+    def updateEventsList(self, now=None):
+        now = (now or tick_scheduler().now).datetime
+
+        # Same minute resolution shortcut as EventsListWidget.updateEventsList
+        updateKey = (events.version, now.replace(second=0, microsecond=0))
+        if updateKey == self.lastUpdateKey:
+            return
+
+        reset = self.lastUpdateKey is None or self.lastUpdateKey[0] != events.version
+        self.lastUpdateKey = updateKey
+
+        self.eventsModel.setEventRows(event_list_rows(now), reset)
 
 
 class PomodoroTimerWidget(QWidget):
     def __init__(self):
         super().__init__()
-        self.workDuration = 25 * 60
-        self.breakDuration = 5 * 60
-        self.isWorkTime = True
-        self.isWaitingClick = False
-        self.timeLeft = self.workDuration
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.updateTimer)
+        self.engine = PomodoroEngine(25 * 60, 5 * 60)
+        # Single shot timer armed for the end of the running session. The
+        # countdown itself is repainted on the shared per second tick.
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.timerFired)
 
         # Layout for controls
         controlLayout = QHBoxLayout()
 
         # Start/Stop button
         self.startStopButton = QPushButton("Start", self)
-        self.startStopButton.setStyleSheet(
-            "QPushButton {background-color: "
-            + f'{APP_PALETTE["error"]}'
-            + "; color: "
-            + f'{APP_PALETTE["on_background"]}'
-            + ";}"
-        )
-        self.startStopButton.setIcon(QIcon("_internal/play.png"))
         self.startStopButton.clicked.connect(self.startStopTimer)
         controlLayout.addWidget(
             self.startStopButton,
@@ -686,14 +1079,6 @@ class PomodoroTimerWidget(QWidget):
 
         # Reset button
         self.resetButton = QPushButton("Reset", self)
-        self.resetButton.setStyleSheet(
-            "QPushButton {background-color: "
-            + f'{APP_PALETTE["error"]}'
-            + "; color: "
-            + f'{APP_PALETTE["on_background"]}'
-            + ";}"
-        )
-        self.resetButton.setIcon(QIcon("_internal/reset.png"))
         self.resetButton.clicked.connect(self.resetTimer)
         controlLayout.addWidget(
             self.resetButton,
@@ -702,17 +1087,6 @@ class PomodoroTimerWidget(QWidget):
 
         # Checkbox for auto_start_next
         self.autoStartNext = QCheckBox("Auto Start Next ", self)
-        self.autoStartNext.setStyleSheet(
-            "QCheckBox::indicator {width: 21px; height: 21px; border: 1px solid; border-color: "
-            + f'{APP_PALETTE["on_background"]}'
-            + "; } QCheckBox::indicator:checked { background-color: "
-            + f'{APP_PALETTE["on_error"]}'
-            + "; } QCheckBox {background-color: "
-            + f'{APP_PALETTE["error"]}'
-            + "; color: "
-            + f'{APP_PALETTE["on_background"]}'
-            + ";}"
-        )
         controlLayout.addWidget(
             self.autoStartNext,
             alignment=(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignBottom),
@@ -728,59 +1102,159 @@ class PomodoroTimerWidget(QWidget):
 
         self.setMinimumSize(350, 350)
 
-        # Add sound effect for Pomodoro timer
-        self.effect = QSoundEffect()
+        self.applyTheme()
+        theme.changed.connect(self.applyTheme)
+
+        # Finished sessions are written on a background thread
+        self.sessionLog = SessionLog(POMODORO_LOG_FILE) if POMODORO_LOG_FILE else None
+        if self.sessionLog is not None:
+            QApplication.instance().aboutToQuit.connect(self.sessionLog.close)
+
+        # Sound effect for Pomodoro timer, see loadSound()
+        self.effect = None
+        self.soundLoaded = False
+
+        QApplication.instance().applicationStateChanged.connect(self.catchUp)
+        # The pie takes the current event's color, also while paused
+        tick_scheduler().subscribe(self.transition, TRANSITION)
+
+    def applyTheme(self):
+        buttonStyle = (
+            "QPushButton {background-color: "
+            + f'{theme.palette["error"]}'
+            + "; color: "
+            + f'{theme.palette["on_background"]}'
+            + ";}"
+        )
+        self.startStopButton.setStyleSheet(buttonStyle)
+        self.resetButton.setStyleSheet(buttonStyle)
+        self.autoStartNext.setStyleSheet(
+            "QCheckBox::indicator {width: 21px; height: 21px; border: 1px solid; border-color: "
+            + f'{theme.palette["on_background"]}'
+            + "; } QCheckBox::indicator:checked { background-color: "
+            + f'{theme.palette["on_error"]}'
+            + "; } QCheckBox {background-color: "
+            + f'{theme.palette["error"]}'
+            + "; color: "
+            + f'{theme.palette["on_background"]}'
+            + ";}"
+        )
+        self.update()
+
+    def loadIcons(self):
+        # Left out of the first frame, the buttons already have their text
+        running = self.engine.isRunning()
+        self.startStopButton.setIcon(icon("pause" if running else "play"))
+        self.resetButton.setIcon(icon("reset"))
+
+    def loadSound(self):
+        # QtMultimedia is slow to import and to start, so it is only loaded
+        # once the window is on screen (or when a session first ends)
+        if self.soundLoaded:
+            return
+        self.soundLoaded = True
+        try:
+            from PyQt6.QtMultimedia import QSoundEffect
+        except ImportError as error:
+            print(f"Sound disabled: {error}")
+            return
+        self.effect = QSoundEffect(self)
         self.effect.setSource(QUrl.fromLocalFile("sound.wav"))
 
+    def playSound(self):
+        self.loadSound()
+        if self.effect is not None:
+            self.effect.play()
+
     def startStopTimer(self):
-        if self.timer.isActive():
-            self.timer.stop()
-            self.startStopButton.setIcon(QIcon("_internal/play.png"))
+        if self.engine.isRunning():
+            self.engine.stop()
+            self.stopTimer()
+            self.startStopButton.setIcon(icon("play"))
             self.startStopButton.setText("Start")
         else:
-            if self.isWaitingClick and self.isWorkTime:
-                self.isWaitingClick = False
-                self.isWorkTime = False
-                self.timeLeft = self.breakDuration
-            elif self.isWaitingClick and not self.isWorkTime:
-                self.isWaitingClick = False
-                self.isWorkTime = True
-                self.timeLeft = self.workDuration
+            self.engine.start()
             self.updateTimer()
-            self.timer.start(1000)
-            self.startStopButton.setIcon(QIcon("_internal/pause.png"))
+            self.startStopButton.setIcon(icon("pause"))
             self.startStopButton.setText("Stop")
 
     def resetTimer(self):
-        self.timer.stop()
-        self.isWorkTime = True
-        self.timeLeft = self.workDuration
+        self.stopTimer()
+        self.engine.reset()
         self.update()
         self.startStopButton.setText("Start")
 
+    def stopTimer(self):
+        self.timer.stop()
+        instruments.timer_stopped("PomodoroTimerWidget.timer")
+        tick_scheduler().unsubscribe(self.tick)
+
+    def timerFired(self):
+        # Only the timer's own timeouts count towards its lateness, not the
+        # updates after a click or a resume
+        instruments.timer_fired("PomodoroTimerWidget.timer")
+        self.updateTimer()
+
     def updateTimer(self):
-        self.timeLeft -= 1
+        if self.engine.poll(self.autoStartNext.isChecked()):
+            self.playSound()
+            self.logFinishedSessions()
+
+        if self.engine.isRunning():
+            msecs = self.engine.msecsToDeadline()
+            instruments.timer_armed("PomodoroTimerWidget.timer", msecs)
+            self.timer.start(msecs)
+            # The countdown needs the per second tick only while running
+            tick_scheduler().subscribe(self.tick, SECOND)
+        elif self.engine.isWaitingClick:
+            self.stopTimer()
+            self.startStopButton.setText("Start")
 
-        if self.timeLeft <= 0:
-            self.effect.play()
-            if self.isWorkTime and self.autoStartNext.isChecked():
-                self.isWorkTime = False
-                self.timeLeft = self.breakDuration
-                self.timer.start(1000)
-            elif not self.isWorkTime and self.autoStartNext.isChecked():
-                self.isWorkTime = True
-                self.timeLeft = self.workDuration
-                self.timer.start(1000)
-            else:
-                self.isWaitingClick = True
-                self.timer.stop()
-                self.startStopButton.setText("Start")
+        self.update(self.pieRect())  # Trigger a repaint of the pie only
+
+    def logFinishedSessions(self):
+        # Queues the sessions that just ended, with the event that was
+        # happening when each of them started
+        sessions = self.engine.finishedSessions
+        self.engine.finishedSessions = []
+        if self.sessionLog is None:
+            return
+        # From the engine's clock to Unix time
+        offset = time.time() - self.engine.clock()
+        for isWork, start, end, length in sessions:
+            started = datetime.fromtimestamp(start + offset)
+            current = events.state_at(seconds_since_midnight(started)).current
+            event = current[-1] if current else None
+            self.sessionLog.record(
+                start + offset,
+                end + offset,
+                "work" if isWork else "break",
+                length,
+                displayed_date(started).isoformat(),
+                event.name if event else None,
+                event.category if event else None,
+            )
 
-        self.update()  # Trigger a repaint
+    def tick(self, now):
+        self.update(self.pieRect())
 
-    def paintEvent(self, event):
-        global current_event_color
+    def transition(self, now):
+        self.update(self.pieRect())
+
+    def catchUp(self, state):
+        # After a resume or when the app becomes active again, don't wait for
+        # the pending tick to bring the display up to date
+        if state == Qt.ApplicationState.ApplicationActive and self.engine.isRunning():
+            self.updateTimer()
 
+    def pieRect(self):
+        rect = self.rect()
+        return QRect(
+            rect.left() + 25, rect.top() + 50, rect.width() - 50, rect.height() - 50
+        )
+
+    @instrumented("PomodoroTimerWidget.paintEvent", frame=True)
+    def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.setRenderHint(QPainter.RenderHint.VerticalSubpixelPositioning)
@@ -788,62 +1262,296 @@ class PomodoroTimerWidget(QWidget):
         painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
         painter.setRenderHint(QPainter.RenderHint.NonCosmeticBrushPatterns)
 
-        rect = self.rect()
-        pieRect = QRect(
-            rect.left() + 25, rect.top() + 50, rect.width() - 50, rect.height() - 50
-        )
+        pieRect = self.pieRect()
         painter.setPen(Qt.PenStyle.NoPen)
-        alpha = 128  # 0 to 255, where 255 is fully opaque
-        transparent_color = QColor(current_event_color)
-        transparent_color.setAlpha(alpha)
-        painter.setBrush(transparent_color)
-        totalTime = self.workDuration if self.isWorkTime else self.breakDuration
-        spanAngle = 360.0 * self.timeLeft / totalTime
+        swatch = current_event_swatch(tick_scheduler().now.seconds)
+        painter.setBrush(swatch.translucentBrush)
+        timeLeft = self.engine.displayedTimeLeft()
+        spanAngle = 360.0 * timeLeft / self.engine.totalTime()
         painter.drawPie(pieRect, 90 * 16, -round(spanAngle * 16))
 
         # Draw digital timer inside the "pie chart"
-        painter.setPen(QColor(APP_PALETTE["on_primary"]))
-        painter.setFont(QFont("Arial", 16))
-        minutes = self.timeLeft // 60
-        seconds = self.timeLeft % 60
-        painter.drawText(
-            pieRect,
-            Qt.AlignmentFlag.AlignCenter,
-            f"{minutes:02d}:{seconds:02d}",
+        minutes = timeLeft // 60
+        seconds = timeLeft % 60
+        if POMODORO_READOUT_STYLE == "dot-matrix":
+            # Same glyphs as the clock, sized to the pie
+            scale = pieRect.width() * 0.55 / DOT_MATRIX_WIDTH
+            atlas = dot_matrix_atlas(
+                scale, self.devicePixelRatioF(), theme.palette["on_primary"]
+            )
+            center = QRectF(pieRect).center()
+            atlas.draw(
+                painter,
+                center.x() - DOT_MATRIX_WIDTH / 2 * scale,
+                center.y() - 7 * scale,
+                f"{minutes:02d}:{seconds:02d}",
+            )
+        else:
+            painter.setPen(theme["on_primary"].color)
+            painter.setFont(QFont("Arial", 16))
+            painter.drawText(
+                pieRect,
+                Qt.AlignmentFlag.AlignCenter,
+                f"{minutes:02d}:{seconds:02d}",
+            )
+
+
+# The week overview dials don't turn: the day start is at the top
+WEEK_DIAL_ANGLE = 360.0 * day_start / 24
+
+# Face layers of the week overview, keyed by size and theme, shared by its
+# seven dials
+week_face_layers = {}
+
+
+def week_face_layer(widget):
+    dpr = widget.devicePixelRatioF()
+    key = (widget.width(), widget.height(), dpr, theme.version)
+    if key not in week_face_layers:
+        if len(week_face_layers) > 8:
+            week_face_layers.clear()  # Old sizes and themes
+        # Hour day_start: nothing is dimmed as past
+        week_face_layers[key] = render_face_layer(
+            widget.width(), widget.height(), dpr, day_start, WEEK_DIAL_ANGLE
         )
+    return week_face_layers[key]
+
+
+class MiniDial(QWidget):
+    # One day of the week overview: the same dial as DarkModeRotating24hClock,
+    # standing still, with the day instead of the time in the middle
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.day = None  # date shown
+        self.isToday = False
+        self.sectors = []  # (sector path, brush), shared with the main clock
+        self.index = None  # AngularIntervalIndex, for the tooltips
+        self.lanes = {}  # id(event) -> (lane, lanes, overlaps)
+        self.error = None
+        self.setMinimumSize(220, 220)
+        self.setMouseTracking(True)
+
+    def setDay(self, day, isToday):
+        self.day = day
+        self.isToday = isToday
+        self.update()
+
+    def setEvents(self, dayEvents):
+        self.error = None
+        self.setToolTip("")
+        layout = zip(*assign_lanes(dayEvents))
+        self.lanes = {id(event): lanes for event, lanes in zip(dayEvents, layout)}
+        self.sectors = [
+            (
+                event_sector_path(event, *self.lanes[id(event)][:2]),
+                theme.category(event).translucentBrush,
+            )
+            for event in dayEvents
+        ]
+        self.index = AngularIntervalIndex(dayEvents)
+        self.update()
+
+    def setError(self, message):
+        self.error = message
+        self.setToolTip(message)
+        self.sectors = []
+        self.index = None
+        self.update()
+
+    def mouseMoveEvent(self, mouseEvent):
+        if self.index is None:
+            return
+        center = QPointF(self.width() / 2, self.height() / 2)
+        mousePos = mouseEvent.position() - center
+        mouseAngle = math.degrees(math.atan2(mousePos.y(), mousePos.x())) % 360
+        # Same radii as the event sectors, in the 250x250 dial space
+        mouseRadius = (
+            math.hypot(mousePos.x(), mousePos.y())
+            * 250
+            / min(self.width(), self.height())
+        )
+
+        QToolTip.hideText()
+        if EVENT_RING_INNER <= mouseRadius <= EVENT_RING_OUTER:
+            mouseSeconds = ((mouseAngle + 90 + WEEK_DIAL_ANGLE) % 360) * 240
+            hovered = self.index.events_at(mouseSeconds)
+            if hovered:
+                QToolTip.showText(
+                    mouseEvent.globalPosition().toPoint(),
+                    event_tooltip(
+                        hovered, mouseRadius, lambda event: self.lanes[id(event)]
+                    ),
+                )
+
+    @instrumented("MiniDial.paintEvent")
+    def paintEvent(self, event):
+        rect = min(self.width(), self.height())
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+        painter.translate(self.width() / 2, self.height() / 2)
+        painter.scale(rect / 250, rect / 250)
+        painter.rotate(-WEEK_DIAL_ANGLE)
+
+        # Only the events are drawn per dial, the face is shared
+        painter.setPen(Qt.PenStyle.NoPen)
+        for path, brush in self.sectors:
+            painter.setBrush(brush)
+            painter.drawPath(path)
+
+        painter.resetTransform()
+        painter.drawPixmap(0, 0, week_face_layer(self))
+
+        painter.translate(self.width() / 2, self.height() / 2)
+        painter.scale(rect / 250, rect / 250)
+        painter.setPen(Qt.PenStyle.NoPen)
+        if self.error is not None:
+            painter.setBrush(theme["error"].brush)
+        elif self.isToday:
+            painter.setBrush(theme["primary"].brush)
+        else:
+            painter.setBrush(theme["secondary"].brush)
+        painter.drawEllipse(-38, -38, 76, 76)
+
+        if self.day is not None:
+            painter.setPen(theme["on_primary"].color)
+            painter.setFont(QFont("Arial", 12))
+            label = self.day.strftime("%a\n%d/%m")
+            if self.error is not None:
+                label += "\n(error)"
+            painter.drawText(
+                QRectF(-38, -38, 76, 76), Qt.AlignmentFlag.AlignCenter, label
+            )
+
+
+class WeekOverviewWindow(QWidget):
+    # Seven mini dials, Monday to Sunday of the displayed week. The schedule
+    # files are read on the thread pool, so the window opens right away and
+    # each dial fills in when its day is loaded.
+    def __init__(self, parent=None):
+        # A separate window, closed with its parent
+        super().__init__(parent, Qt.WindowType.Window)
+        self.setWindowTitle("Chrono-Compass - Week overview")
+        # Only created when first shown, long after startup
+        self.setWindowIcon(icon("icon"))
+        self.applyTheme()
+        theme.changed.connect(self.applyTheme)
+        self.resize(1000, 520)
+
+        layout = QGridLayout(self)
+        self.dials = []
+        for day_of_week in range(7):
+            dial = MiniDial(self)
+            layout.addWidget(dial, day_of_week // 4, day_of_week % 4)
+            self.dials.append(dial)
+
+        self.loaderSignals = ScheduleLoadSignals(self)
+        self.loaderSignals.loaded.connect(self.dayLoaded)
+        # Results of an older reload() are ignored
+        self.generation = 0
+
+    def applyTheme(self):
+        # Also repaints the dials
+        self.setStyleSheet(
+            "background-color: " + f'{theme.palette["background_variant"]}' + ";"
+        )
+
+    def reload(self):
+        self.generation += 1
+        today = displayed_date()
+        monday = today - timedelta(days=today.weekday())
+        for day_of_week, dial in enumerate(self.dials):
+            day = monday + timedelta(days=day_of_week)
+            dial.setDay(day, day == today)
+            QThreadPool.globalInstance().start(
+                ScheduleLoadTask(
+                    day, (self.generation, day_of_week), self.loaderSignals
+                )
+            )
+
+    def dayLoaded(self, key, result):
+        generation, day_of_week = key
+        if generation != self.generation:
+            return
+        sources, issues, ms = result
+        if sources is None:
+            # A missing file is an empty day, only unreadable ones are shown
+            self.dials[day_of_week].setError("\n".join(map(str, issues)))
+        else:
+            self.dials[day_of_week].setEvents(
+                [event for source in sources for event in source]
+            )
+
+
+class InstrumentationOverlay(QLabel):
+    # Debug overlay with the live instrumentation numbers, toggled with F12
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setFont(QFont("Monospace", 8))
+        self.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 170); color: "
+            + f'{theme.palette["on_background"]}'
+            + "; padding: 6px;"
+        )
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        # isHidden() rather than isVisible(): the window may not be shown yet
+        self.setHidden(not self.isHidden())
+        if not self.isHidden():
+            self.refresh()
+            self.raise_()
+            self.timer.start(1000)
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        self.setText("\n".join(instruments.summary_lines()) or "No samples yet")
+        self.adjustSize()
 
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Chrono-Compass")
-        self.setWindowIcon(QIcon("_internal/icon.png"))
         self.setGeometry(330, 150, 1280, 720)
 
         self.initUI()
 
+        # Low-power mode: the tick scheduler is suspended while the window is
+        # minimized, hidden, fully covered or the screen is locked (for the
+        # platforms that report it as hidden/unexposed), see updatePowerState()
+        self.exposeWatchedWindow = None
+        QApplication.instance().applicationStateChanged.connect(self.updatePowerState)
+
     def initUI(self):
-        self.setStyleSheet(
-            "background-color: " + f'{APP_PALETTE["background_variant"]}' + ";"
-        )
         self.setAutoFillBackground(True)
         self.centralWidget = QWidget(self)  # Create a central widget
         self.setCentralWidget(self.centralWidget)
 
         self.layout = QHBoxLayout()
 
+        # Lets the shared tick scheduler wake up right when an event starts or
+        # ends
+        tick_scheduler().nextTransition = events.next_transition
+
         self.clock = DarkModeRotating24hClock()
         self.layout.addWidget(self.clock, alignment=Qt.AlignmentFlag.AlignLeft)
 
         verticalContainer = QWidget()
-        verticalLayout = QVBoxLayout(verticalContainer)
+        self.verticalLayout = verticalLayout = QVBoxLayout(verticalContainer)
 
-        self.eventsListWidget = EventsListWidget()
-        self.eventsListWidget.setMinimumWidth(300)
-        verticalLayout.addWidget(
-            self.eventsListWidget,
-            alignment=(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop),
-        )
+        self.eventsListWidget = None
+        self.updateEventsListMode()
+
+        # Rows rejected when loading the schedules, listed in the tooltip
+        self.scheduleIssuesLabel = QLabel()
+        self.scheduleIssuesLabel.hide()
+        verticalLayout.addWidget(self.scheduleIssuesLabel)
 
         self.pomodoroTimer = PomodoroTimerWidget()
         verticalLayout.addWidget(
@@ -855,12 +1563,304 @@ class MainWindow(QMainWindow):
 
         self.centralWidget.setLayout(self.layout)
 
+        # The schedule is loaded on the thread pool, the widgets start empty
+        # and are updated when it arrives (see main())
+        self.scheduleLoader = ScheduleLoader(self)
+        self.scheduleLoader.scheduleChanged.connect(self.scheduleChanged)
+        self.scheduleLoader.issuesChanged.connect(self.showScheduleIssues)
+        # Today's dial moves along, and on Mondays the whole week
+        self.scheduleLoader.dayChanged.connect(self.reloadWeekOverview)
+        self.scheduleWatcher = None
+
+        # Week overview, opened with W
+        self.weekOverview = None
+        QShortcut(QKeySequence("W"), self, self.showWeekOverview)
+
+        # Palette, cycled through THEMES with T
+        self.applyTheme()
+        theme.changed.connect(self.applyTheme)
+        QShortcut(QKeySequence("T"), self, self.nextTheme)
+
+    def applyTheme(self):
+        # The style sheets are cascaded to the children, setting them again
+        # repaints the whole window. Cached layers notice theme.version.
+        self.setStyleSheet(
+            "background-color: " + f'{theme.palette["background_variant"]}' + ";"
+        )
+        self.scheduleIssuesLabel.setStyleSheet(
+            "color: "
+            + f'{theme.palette["on_background"]}'
+            + "; background-color: "
+            + f'{theme.palette["error"]}'
+            + "; padding: 4px;"
+        )
+
+    def nextTheme(self):
+        palettes = list(THEMES.values())
+        current = next(
+            (i for i, palette in enumerate(palettes) if palette is theme.palette), -1
+        )
+        theme.setPalette(palettes[(current + 1) % len(palettes)])
+
+    def updateEventsListMode(self):
+        # In "auto" mode the list is swapped when the schedule grows past (or
+        # shrinks under) EVENTS_LIST_VIEW_THRESHOLD
+        useView = EVENTS_LIST_MODE == "view" or (
+            EVENTS_LIST_MODE == "auto" and len(events) > EVENTS_LIST_VIEW_THRESHOLD
+        )
+        if self.eventsListWidget is not None:
+            if isinstance(self.eventsListWidget, EventsListView) == useView:
+                return
+            self.verticalLayout.removeWidget(self.eventsListWidget)
+            self.eventsListWidget.deleteLater()
+
+        if useView:
+            # Scrollable list that only paints the visible rows
+            self.eventsListWidget = EventsListView()
+            self.eventsListWidget.setFixedWidth(
+                370 + self.eventsListWidget.verticalScrollBar().sizeHint().width()
+            )
+            self.verticalLayout.insertWidget(0, self.eventsListWidget, stretch=1)
+        else:
+            self.eventsListWidget = EventsListWidget()
+            self.eventsListWidget.setMinimumWidth(300)
+            self.verticalLayout.insertWidget(
+                0,
+                self.eventsListWidget,
+                alignment=(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop),
+            )
+
+    def scheduleChanged(self):
+        self.clock.update()
+        self.updateEventsListMode()
+        self.eventsListWidget.updateEventsList()
+
+    def showScheduleIssues(self, issues):
+        self.scheduleIssuesLabel.setVisible(bool(issues))
+        self.scheduleIssuesLabel.setText(
+            f"{len(issues)} schedule issue{'s' if len(issues) > 1 else ''}"
+            " (hover for details)"
+        )
+        self.scheduleIssuesLabel.setToolTip("\n".join(map(str, issues)))
+
+    def runCommands(self, commands):
+        # Sent by a later launch of the app, see single_instance.py
+        for command in commands:
+            if command == "raise":
+                if self.isMinimized():
+                    self.showNormal()
+                self.show()
+                self.raise_()
+                self.activateWindow()
+            elif command == "reload":
+                self.scheduleLoader.load()
+                self.reloadWeekOverview()
+            elif command == "start-pomodoro":
+                if not self.pomodoroTimer.engine.isRunning():
+                    self.pomodoroTimer.startStopTimer()
+
+    def startDeferred(self):
+        # Everything not needed for the first frame, see main()
+        if self.scheduleWatcher is not None:
+            return
+
+        # Hot reload of the schedule files
+        self.scheduleWatcher = ScheduleWatcher(self.scheduleLoader, self)
+        self.scheduleWatcher.reloaded.connect(self.reloadWeekOverview)
+
+        self.setWindowIcon(icon("icon"))
+        self.pomodoroTimer.loadIcons()
+        self.pomodoroTimer.loadSound()
+
+    def reloadWeekOverview(self):
+        # A hidden overview is reloaded when it is shown again
+        if self.weekOverview is not None and self.weekOverview.isVisible():
+            self.weekOverview.reload()
+
+    def showWeekOverview(self):
+        if self.weekOverview is None:
+            self.weekOverview = WeekOverviewWindow(self)
+        self.weekOverview.reload()
+        self.weekOverview.show()
+        self.weekOverview.raise_()
+        self.weekOverview.activateWindow()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        window = self.windowHandle()
+        if window is not None and window is not self.exposeWatchedWindow:
+            # Expose events only reach the native window
+            window.installEventFilter(self)
+            self.exposeWatchedWindow = window
+        self.updatePowerState()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.updatePowerState()
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.Type.WindowStateChange:
+            self.updatePowerState()
+        super().changeEvent(event)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Expose:
+            self.updatePowerState()
+        return False
+
+    def isOnScreen(self):
+        window = self.windowHandle()
+        return not (
+            self.isHidden()
+            or self.isMinimized()
+            or (window is not None and not window.isExposed())
+            or QApplication.applicationState()
+            in (
+                Qt.ApplicationState.ApplicationHidden,
+                Qt.ApplicationState.ApplicationSuspended,
+            )
+        )
+
+    def updatePowerState(self, *args):
+        # Resuming catches every widget up at once, see TickScheduler
+        tick_scheduler().setSuspended(not self.isOnScreen())
+
+    def enableInstrumentation(self, dumpPath, showOverlay):
+        instruments.enabled = True
+
+        self.instrumentationOverlay = InstrumentationOverlay(self.centralWidget)
+        QShortcut(QKeySequence("F12"), self, self.instrumentationOverlay.toggle)
+        if showOverlay:
+            self.instrumentationOverlay.toggle()
+
+        # Periodic JSON dump to a local file
+        self.instrumentationTimer = QTimer(self)
+        self.instrumentationTimer.timeout.connect(lambda: instruments.dump(dumpPath))
+        self.instrumentationTimer.start(INSTRUMENTATION_DUMP_INTERVAL * 1000)
+
+
+class FirstPaintWatcher(QObject):
+    # Emits painted once, right after the first paint of a widget
+    painted = pyqtSignal()
+
+    def __init__(self, widget):
+        super().__init__(widget)
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            # Queued, so it runs once the paint is done
+            QTimer.singleShot(0, self.painted.emit)
+        return False
+
+
+def parse_args(argv):
+    # Unknown arguments are left for Qt (e.g. -platform on Windows)
+    parser = argparse.ArgumentParser(prog="Chrono-Compass", allow_abbrev=False)
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        default=instruments.enabled,
+        help="record paint, update and timer timings "
+        "(same as CHRONO_COMPASS_INSTRUMENT=1)",
+    )
+    parser.add_argument(
+        "--instrument-file",
+        default="chrono_compass_metrics.json",
+        help="where the timings are periodically written as JSON",
+    )
+    parser.add_argument(
+        "--instrument-overlay",
+        action="store_true",
+        help="show the timings on screen from the start (toggle with F12)",
+    )
+    parser.add_argument(
+        "--theme",
+        choices=THEMES,
+        help="color palette to start with (cycle through them with T)",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="print the current and next events as JSON lines instead of "
+        "opening a window (see --headless --help)",
+    )
+    parser.add_argument(
+        "--reload",
+        action="store_true",
+        help="reload the schedule of the running instance",
+    )
+    parser.add_argument(
+        "--start-pomodoro",
+        action="store_true",
+        help="start the Pomodoro timer (of the running instance, if any)",
+    )
+    parser.add_argument(
+        "--new-instance",
+        action="store_true",
+        help="start another instance even if one is already running",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print the time spent on imports, schedule loading, widget "
+        "construction and first paint",
+    )
+    return parser.parse_known_args(argv)
+
 
 def main():
-    load_events_from_csv()
-    app = QApplication(sys.argv)
+    profile = StartupProfile(STARTUP_STARTED)
+    profile.mark("imports")
+    args, qt_args = parse_args(sys.argv[1:])
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle(APP_STYLE)
+    profile.mark("QApplication")
+
+    # Another instance may have started since the check at the top
+    instanceServer = InstanceServer(app)
+    if not args.new_instance and not instanceServer.listen():
+        forward_to_running_instance(sys.argv[1:])
+        sys.exit(0)
+
+    if args.theme is not None:
+        theme.setPalette(THEMES[args.theme])
     mainWindow = MainWindow()
+    if args.instrument or args.instrument_overlay:
+        mainWindow.enableInstrumentation(args.instrument_file, args.instrument_overlay)
+    profile.mark("widgets")
+
+    # The schedule is read on the thread pool while the window is shown
+    pending = {"first paint", "schedule load"}
+
+    def startupStepDone(step):
+        pending.discard(step)
+        if not pending and args.profile_startup:
+            print("Startup profile:", *profile.report_lines(), sep="\n  ")
+
+    def scheduleLoaded(ms):
+        if "schedule load" in pending:
+            profile.add("schedule load (worker)", ms)
+            startupStepDone("schedule load")
+
+    instanceServer.commandsReceived.connect(mainWindow.runCommands)
+    if args.start_pomodoro:
+        mainWindow.runCommands(["start-pomodoro"])
+
+    mainWindow.scheduleLoader.loaded.connect(scheduleLoaded)
+    mainWindow.scheduleLoader.load()
+
+    # Show the window first, then start the non-essential services
+    def firstPainted():
+        profile.mark("show and first paint")
+        mainWindow.startDeferred()
+        profile.mark("deferred startup")
+        startupStepDone("first paint")
+
+    firstPaint = FirstPaintWatcher(mainWindow.clock)
+    firstPaint.painted.connect(firstPainted)
+    QTimer.singleShot(DEFERRED_STARTUP_TIMEOUT, mainWindow.startDeferred)
     mainWindow.show()
     sys.exit(app.exec())
 
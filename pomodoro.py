@@ -0,0 +1,93 @@
+# The Pomodoro timer's state machine, driven by a clock function so it can be
+# run without Qt (PomodoroTimerWidget only polls it and draws it) and tested
+# against a simulated clock, see tests/test_pomodoro.py.
+import math
+import time
+
+
+def monotonic_time():
+    # Prefer a clock that keeps counting while the machine is suspended, so a
+    # session spanning a suspend still ends on time (CLOCK_BOOTTIME on Linux)
+    if hasattr(time, "CLOCK_BOOTTIME"):
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.monotonic()
+
+
+class PomodoroEngine:
+    # Deadline based Pomodoro state. The time left is always derived from a
+    # monotonic deadline instead of being counted down, so late or missed
+    # ticks can never stretch a session.
+    def __init__(self, workDuration, breakDuration, clock=monotonic_time):
+        self.workDuration = workDuration
+        self.breakDuration = breakDuration
+        self.clock = clock
+        self.isWorkTime = True
+        self.isWaitingClick = False
+        self.deadline = None  # Only set while running
+        self.pausedTimeLeft = workDuration
+        # Clock time the current session was first started, and the sessions
+        # that ended since as (is work, start, end, length) for the log
+        self.sessionStart = None
+        self.finishedSessions = []
+
+    def isRunning(self):
+        return self.deadline is not None
+
+    def totalTime(self):
+        return self.workDuration if self.isWorkTime else self.breakDuration
+
+    def timeLeft(self):
+        # Exact time left in seconds
+        if self.deadline is None:
+            return self.pausedTimeLeft
+        return max(0.0, self.deadline - self.clock())
+
+    def displayedTimeLeft(self):
+        # Whole seconds shown on screen, 25:00 until a full second has elapsed
+        return math.ceil(self.timeLeft())
+
+    def start(self):
+        if self.isWaitingClick:
+            self.isWaitingClick = False
+            self.isWorkTime = not self.isWorkTime
+            self.pausedTimeLeft = self.totalTime()
+        if self.sessionStart is None:
+            self.sessionStart = self.clock()
+        self.deadline = self.clock() + self.pausedTimeLeft
+
+    def stop(self):
+        self.pausedTimeLeft = self.timeLeft()
+        self.deadline = None
+
+    def reset(self):
+        self.deadline = None
+        self.sessionStart = None
+        self.isWorkTime = True
+        self.isWaitingClick = False
+        self.pausedTimeLeft = self.workDuration
+
+    def poll(self, autoStartNext):
+        # Handles every session that ended since the last call and returns
+        # how many did. After a suspend several sessions may have ended, the
+        # next deadlines are chained from the previous ones so they don't drift.
+        finished = 0
+        now = self.clock()
+        while self.deadline is not None and self.deadline <= now:
+            finished += 1
+            self.finishedSessions.append(
+                (self.isWorkTime, self.sessionStart, self.deadline, self.totalTime())
+            )
+            if autoStartNext:
+                self.sessionStart = self.deadline
+                self.isWorkTime = not self.isWorkTime
+                self.deadline += self.totalTime()
+            else:
+                self.isWaitingClick = True
+                self.pausedTimeLeft = 0
+                self.sessionStart = None
+                self.deadline = None
+        return finished
+
+    def msecsToDeadline(self):
+        # Time until the running session ends, 1ms late rather than early
+        return math.ceil(self.timeLeft() * 1000) + 1
@@ -0,0 +1,259 @@
+# Recurring events: RRULE style rules (a subset of RFC 5545) with exception
+# dates, for everything that isn't strictly weekly. They are read from a CSV
+# file next to the weekly schedules:
+#
+#   name,start_time,end_time,category,start_date,rule,exceptions
+#   Shift,07:00,15:00,Work,2026-01-05,"FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TU",
+#   Review,16:00,17:00,Meeting,2026-01-01,FREQ=MONTHLY;BYDAY=-1FR,2026-12-25
+#   Dentist,09:30,10:15,Other,2026-11-03,,
+#
+# Supported rule parts: FREQ (DAILY, WEEKLY, MONTHLY or YEARLY), INTERVAL,
+# COUNT, UNTIL (a date), BYDAY (MO to SU, with an ordinal within the month for
+# monthly and yearly rules, e.g. 1MO or -1FR), BYMONTHDAY (negative counts
+# from the end of the month) and BYMONTH. An empty rule is a one-off event on
+# start_date. Exceptions are dates separated by spaces. Rules containing
+# commas have to be quoted.
+#
+# Dates are schedule days: like the weekly files, an event at 02:00 belongs
+# to the previous day's schedule.
+#
+# Whether a rule occurs on a day is computed from the date alone, so nothing
+# is expanded up front and rules spanning years cost nothing until one of
+# their days is displayed. Only COUNT needs to walk the earlier occurrences.
+import calendar
+import csv
+import io
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from event_store import Event, ScheduleIssue, parse_event_columns
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+FREQUENCIES = ["DAILY", "WEEKLY", "MONTHLY", "YEARLY"]
+
+# Expanded days kept by RecurrenceSet.events_for()
+EXPANDED_DAYS_CACHE_SIZE = 32
+
+
+def parse_date(text):
+    return datetime.strptime(text.strip(), "%Y-%m-%d").date()
+
+
+def parse_weekday(text):
+    # "MO" -> (None, 0), "-1FR" -> (-1, 4)
+    text = text.strip().upper()
+    if text[-2:] not in WEEKDAYS:
+        raise ValueError(f"Unknown weekday {text!r}")
+    return (int(text[:-2]) if text[:-2] else None, WEEKDAYS.index(text[-2:]))
+
+
+def month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+class Rule:
+    __slots__ = (
+        "name",
+        "start",
+        "end",
+        "category",
+        "start_date",
+        "freq",
+        "interval",
+        "count",
+        "until",
+        "by_day",
+        "by_month_day",
+        "by_month",
+        "exceptions",
+        "counted",
+    )
+
+    def __init__(self, name, start, end, category, start_date, rule="", exceptions=()):
+        self.name = name
+        self.start = start  # Seconds since midnight
+        self.end = end
+        self.category = category
+        self.start_date = start_date
+        self.exceptions = frozenset(exceptions)
+        self.counted = None  # Occurrences allowed by COUNT, see occurs_on()
+
+        # An empty rule happens once
+        self.freq = None
+        self.interval = 1
+        self.count = 1 if not rule.strip() else None
+        self.until = None
+        self.by_day = []
+        self.by_month_day = []
+        self.by_month = []
+        for part in filter(None, rule.upper().split(";")):
+            key, _, value = part.partition("=")
+            if key == "FREQ":
+                if value not in FREQUENCIES:
+                    raise ValueError(f"Unsupported frequency {value!r}")
+                self.freq = value
+            elif key == "INTERVAL":
+                self.interval = int(value)
+                if self.interval < 1:
+                    raise ValueError("INTERVAL must be at least 1")
+            elif key == "COUNT":
+                self.count = int(value)
+            elif key == "UNTIL":
+                self.until = datetime.strptime(value[:8], "%Y%m%d").date()
+            elif key == "BYDAY":
+                self.by_day = [parse_weekday(day) for day in value.split(",")]
+            elif key == "BYMONTHDAY":
+                self.by_month_day = [int(day) for day in value.split(",")]
+            elif key == "BYMONTH":
+                self.by_month = [int(month) for month in value.split(",")]
+            else:
+                raise ValueError(f"Unsupported rule part {key!r}")
+        if rule.strip() and self.freq is None:
+            raise ValueError(f"Rule without FREQ: {rule!r}")
+
+    def month_days(self, year, month):
+        # Days of a month matching BYMONTHDAY and BYDAY, by default the same
+        # day of the month as start_date
+        last = calendar.monthrange(year, month)[1]
+        days = set()
+        if self.by_month_day:
+            for day in self.by_month_day:
+                day = day if day > 0 else last + 1 + day
+                if 1 <= day <= last:
+                    days.add(day)
+        if self.by_day:
+            first_weekday = calendar.weekday(year, month, 1)
+            weekdays = set()
+            for ordinal, weekday in self.by_day:
+                matching = range(1 + (weekday - first_weekday) % 7, last + 1, 7)
+                if ordinal is None:
+                    weekdays.update(matching)
+                elif -len(matching) <= ordinal <= len(matching) and ordinal:
+                    weekdays.add(matching[ordinal if ordinal < 0 else ordinal - 1])
+            days = days & weekdays if self.by_month_day else weekdays
+        elif not self.by_month_day and self.start_date.day <= last:
+            days.add(self.start_date.day)
+        return days
+
+    def matches(self, day):
+        # The rule's pattern, without COUNT and the exceptions
+        if day < self.start_date or (self.until and day > self.until):
+            return False
+        if self.freq is None:
+            return day == self.start_date
+        if self.by_month and day.month not in self.by_month:
+            return False
+
+        if self.freq == "DAILY":
+            if (day - self.start_date).days % self.interval:
+                return False
+            if self.by_month_day and day.day not in self.month_days(
+                day.year, day.month
+            ):
+                return False
+            return not self.by_day or any(
+                weekday == day.weekday() for _, weekday in self.by_day
+            )
+        if self.freq == "WEEKLY":
+            weeks = (day - self.start_date).days + self.start_date.weekday()
+            if weeks // 7 % self.interval:
+                return False
+            if self.by_day:
+                return any(weekday == day.weekday() for _, weekday in self.by_day)
+            return day.weekday() == self.start_date.weekday()
+        if self.freq == "MONTHLY":
+            if (month_index(day) - month_index(self.start_date)) % self.interval:
+                return False
+        else:  # YEARLY
+            if (day.year - self.start_date.year) % self.interval:
+                return False
+            if not self.by_month and day.month != self.start_date.month:
+                return False
+        return day.day in self.month_days(day.year, day.month)
+
+    def candidates(self, last):
+        # Lazily generates the days matching the pattern from start_date up to
+        # last, in order
+        day = self.start_date
+        while day <= last:
+            if self.matches(day):
+                yield day
+            day += timedelta(days=1)
+
+    def occurs_on(self, day):
+        if day in self.exceptions or not self.matches(day):
+            return False
+        if self.count is None:
+            return True
+        # Exceptions still count towards COUNT (as in RFC 5545). The allowed
+        # days are only generated up to the first day asked for, and extended
+        # when a later one is.
+        if self.counted is None or (
+            len(self.counted[0]) < self.count and self.counted[1] < day
+        ):
+            occurrences = []
+            for occurrence in self.candidates(day):
+                occurrences.append(occurrence)
+                if len(occurrences) == self.count:
+                    break
+            self.counted = (frozenset(occurrences), day)
+        return day in self.counted[0]
+
+    def event(self):
+        return Event(self.name, self.start, self.end, self.category)
+
+
+def parse_recurrence_csv(text, filepath=""):
+    # Returns the rules and a ScheduleIssue for every rejected row
+    rules = []
+    issues = []
+    reader = csv.reader(io.StringIO(text))
+    next(reader, None)  # Skip header row
+
+    for row in reader:
+        if not row or not any(row):
+            continue
+
+        try:
+            name, start, end, category = parse_event_columns(row)
+            if len(row) < 5:
+                raise ValueError("missing start_date column")
+            rules.append(
+                Rule(
+                    name,
+                    start,
+                    end,
+                    category,
+                    parse_date(row[4]),
+                    row[5] if len(row) > 5 else "",
+                    [parse_date(d) for d in row[6].split()] if len(row) > 6 else (),
+                )
+            )
+        except ValueError as error:
+            issues.append(ScheduleIssue(filepath, reader.line_num, str(error)))
+    return rules, issues
+
+
+class RecurrenceSet:
+    # All the recurring rules, expanded one day at a time
+    def __init__(self, rules, cache_size=EXPANDED_DAYS_CACHE_SIZE):
+        self.rules = rules
+        self.cache_size = cache_size
+        self.days = OrderedDict()  # date -> events, least recently used first
+
+    def expand(self, day):
+        # Generates the events of one schedule day
+        for rule in self.rules:
+            if rule.occurs_on(day):
+                yield rule.event()
+
+    def events_for(self, day):
+        # Same as expand() but cached, the same list is returned for the same
+        # day as long as it stays in the cache
+        if day in self.days:
+            self.days.move_to_end(day)
+            return self.days[day]
+        events = self.days[day] = list(self.expand(day))
+        if len(self.days) > self.cache_size:
+            self.days.popitem(last=False)
+        return events
@@ -0,0 +1,187 @@
+# Compiled cache of the week_schedules CSV files, so a warm start does not
+# parse anything. One little endian binary file:
+#
+#   header    magic, format version, file count, record count, issue count,
+#             string count
+#   files     per schedule file: path (string index), mtime_ns, size, sha1,
+#             first record, record count, first issue and issue count
+#   records   per event: start and end (seconds since midnight), name and
+#             category (string indexes)
+#   issues    per rejected row: line and reason (string index)
+#   strings   end offsets of every string, then the UTF-8 strings back to back
+#
+# The file is memory mapped and only the records of the requested schedule
+# are turned into events.
+import mmap
+import os
+import struct
+
+from event_store import Event, ScheduleIssue
+
+MAGIC = b"CCSC"
+FORMAT_VERSION = 2
+
+HEADER = struct.Struct("<4sHHIII")
+FILE_ENTRY = struct.Struct("<Iqq20sIIII")
+RECORD = struct.Struct("<iiII")
+ISSUE = struct.Struct("<II")
+OFFSET = struct.Struct("<I")
+
+
+class ScheduleCache:
+    # Read side of the cache. Use open(), which returns None when there is no
+    # usable cache (missing, corrupt or older format).
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        self.strings = {}
+        magic, version, file_count, record_count, issue_count, string_count = (
+            HEADER.unpack_from(data, 0)
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("not a schedule cache of this version")
+
+        self.records_offset = HEADER.size + file_count * FILE_ENTRY.size
+        self.issues_offset = self.records_offset + record_count * RECORD.size
+        offsets_offset = self.issues_offset + issue_count * ISSUE.size
+        self.string_ends = struct.unpack_from(f"<{string_count}I", data, offsets_offset)
+        self.strings_offset = offsets_offset + string_count * OFFSET.size
+        strings_size = self.string_ends[-1] if string_count else 0
+        if self.strings_offset + strings_size > len(data):
+            raise ValueError("truncated schedule cache")
+
+        # Schedule file path -> (mtime_ns, size, sha1 hex digest, first record,
+        # record count, first issue, issue count)
+        self.entries = {}
+        for i in range(file_count):
+            path_index, mtime_ns, size, sha1, first, count, first_issue, issues = (
+                FILE_ENTRY.unpack_from(data, HEADER.size + i * FILE_ENTRY.size)
+            )
+            if first + count > record_count or first_issue + issues > issue_count:
+                raise ValueError("corrupt schedule cache")
+            self.entries[self.string(path_index)] = (
+                mtime_ns,
+                size,
+                sha1.hex(),
+                first,
+                count,
+                first_issue,
+                issues,
+            )
+
+    @classmethod
+    def open(cls, path):
+        try:
+            with open(path, "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # Missing or empty
+            return None
+        try:
+            return cls(path, data)
+        except (struct.error, ValueError, IndexError, UnicodeDecodeError) as error:
+            print(f"Schedule cache ignored: {error}")
+            data.close()
+            return None
+
+    def close(self):
+        # Must be closed before the file is replaced (Windows keeps mapped
+        # files locked)
+        self.data.close()
+
+    def string(self, i):
+        # Decoded once, names and categories repeat a lot
+        string = self.strings.get(i)
+        if string is None:
+            start = self.string_ends[i - 1] if i else 0
+            end = self.string_ends[i]
+            string = self.strings[i] = bytes(
+                self.data[self.strings_offset + start : self.strings_offset + end]
+            ).decode()
+        return string
+
+    def events(self, filepath):
+        # The events of a schedule file, in file order
+        _, _, _, first, count, _, _ = self.entries[filepath]
+        events = []
+        for i in range(first, first + count):
+            start, end, name, category = RECORD.unpack_from(
+                self.data, self.records_offset + i * RECORD.size
+            )
+            events.append(Event(self.string(name), start, end, self.string(category)))
+        return events
+
+    def issues(self, filepath):
+        # The rows of a schedule file that were rejected when it was parsed
+        _, _, _, _, _, first, count = self.entries[filepath]
+        issues = []
+        for i in range(first, first + count):
+            line, reason = ISSUE.unpack_from(
+                self.data, self.issues_offset + i * ISSUE.size
+            )
+            issues.append(ScheduleIssue(filepath, line, self.string(reason)))
+        return issues
+
+
+def write_schedule_cache(path, schedules):
+    # schedules: (filepath, mtime_ns, size, sha1 hex digest, events, issues)
+    # for each schedule file. Written to a temporary file first and swapped in.
+    strings = {}
+
+    def string_index(string):
+        if string not in strings:
+            strings[string] = len(strings)
+        return strings[string]
+
+    entries = []
+    records = []
+    issue_records = []
+    for filepath, mtime_ns, size, sha1, events, issues in schedules:
+        entries.append(
+            FILE_ENTRY.pack(
+                string_index(filepath),
+                mtime_ns,
+                size,
+                bytes.fromhex(sha1),
+                len(records),
+                len(events),
+                len(issue_records),
+                len(issues),
+            )
+        )
+        for issue in issues:
+            issue_records.append(ISSUE.pack(issue.line, string_index(issue.reason)))
+        for event in events:
+            records.append(
+                RECORD.pack(
+                    event.start,
+                    event.end,
+                    string_index(event.name),
+                    string_index(event.category),
+                )
+            )
+
+    encoded = [string.encode() for string in strings]
+    ends = []
+    end = 0
+    for string in encoded:
+        end += len(string)
+        ends.append(end)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                len(entries),
+                len(records),
+                len(issue_records),
+                len(ends),
+            )
+        )
+        file.writelines(entries)
+        file.writelines(records)
+        file.writelines(issue_records)
+        file.write(struct.pack(f"<{len(ends)}I", *ends))
+        file.writelines(encoded)
+    os.replace(temporary, path)
@@ -0,0 +1,275 @@
+# Where the schedules come from and how a day's schedule is read: the weekly
+# CSV files, the recurring events (recurrence.py) and the calendar exports
+# (ics_import.py), with the compiled cache (schedule_cache.py) in front.
+# Shared by the app and by the headless status feed (headless.py), which
+# starts without Qt: neither this module nor the ones above may import it.
+import csv
+import glob
+import hashlib
+import io
+import os
+import threading
+from datetime import datetime, timedelta
+
+from event_store import Event, ScheduleIssue, parse_event_columns
+from ics_import import read_ics_file
+from recurrence import RecurrenceSet, parse_recurrence_csv
+from schedule_cache import ScheduleCache, write_schedule_cache
+
+# Global "day start" time
+day_start = 6
+
+# Known categories and their colors, anything else is shown as "Other"
+CATEGORY_COLORS = {
+    "Work": "#BB86FC",
+    "Meeting": "#11009E",
+    "Exercise": "#03DAC6",
+    "Food": "#f60e3b",
+    "Duties": "#6527BE",
+    "Other": "#77ACF1",
+    "Sleep": "#000000",
+}
+
+SCHEDULES_DIR = "week_schedules"
+DAY_NAMES = [
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+]
+# Optional recurring events (biweekly shifts, monthly reviews, one-offs...),
+# added to the weekly schedule of the days they occur on. See recurrence.py.
+RECURRENCE_FILE = f"{SCHEDULES_DIR}/recurring.csv"
+
+
+# Calendar exports (.ics) next to the weekly schedules, imported the same way.
+# See ics_import.py.
+def calendar_paths():
+    return sorted(glob.glob(f"{SCHEDULES_DIR}/*.ics"))
+
+
+# Compiled cache of every schedule file, so a warm start parses nothing (see
+# schedule_cache.py). Rebuilt when a schedule changes. None disables it.
+SCHEDULE_CACHE_FILE = "schedule_cache.bin"
+
+# Parsed schedule files, keyed by path: (mtime_ns, size, sha1, events, issues)
+schedule_files = {}
+# Parsed RECURRENCE_FILE: (mtime_ns, size, RecurrenceSet, issues)
+recurrence_file = None
+# Imported calendars, keyed by path: (mtime_ns, size, first day of the
+# imported week, day -> events, issues)
+calendar_files = {}
+# Memory mapped SCHEDULE_CACHE_FILE, and whether it needs to be rewritten
+schedule_cache = None
+schedule_cache_stale = False
+# The app reads schedules on its thread pool (see ScheduleLoadTask in main.py),
+# everything above is only touched while holding this lock
+schedule_cache_lock = threading.RLock()
+
+
+def schedule_path(day_of_week):
+    return f"{SCHEDULES_DIR}/{day_of_week}_{DAY_NAMES[day_of_week]}_schedule.csv"
+
+
+def displayed_date(now=None):
+    if now is None:
+        now = datetime.now()
+
+    # Only consider current day if after 6:00
+    if now.hour < day_start:
+        adjusted_date = now - timedelta(days=1)
+    else:
+        adjusted_date = now
+
+    return adjusted_date.date()
+
+
+def displayed_day_of_week():
+    return displayed_date().weekday()
+
+
+def parse_schedule_csv(text, filepath=""):
+    # Returns the events and a ScheduleIssue for every rejected row. Fields are
+    # stripped and times normalized, see parse_event_columns().
+    parsed_events = []
+    issues = []
+    reader = csv.reader(io.StringIO(text))
+    next(reader, None)  # Skip header row
+
+    for row in reader:
+        if not row or not any(row):
+            continue
+
+        try:
+            parsed_events.append(Event(*parse_event_columns(row)))
+        except ValueError as error:
+            issues.append(ScheduleIssue(filepath, reader.line_num, str(error)))
+    return parsed_events, issues
+
+
+def open_schedule_cache():
+    global schedule_cache, schedule_cache_stale
+    with schedule_cache_lock:
+        if schedule_cache is None and SCHEDULE_CACHE_FILE and not schedule_cache_stale:
+            schedule_cache = ScheduleCache.open(SCHEDULE_CACHE_FILE)
+            schedule_cache_stale = schedule_cache is None
+        return schedule_cache
+
+
+def read_schedule_file(filepath):
+    # Returns the events and issues of a schedule file, parsing it only when
+    # its content changed since the last read and isn't in the compiled cache
+    # either. A touched but identical file (same hash) keeps its cached events.
+    global schedule_cache_stale
+
+    with schedule_cache_lock:
+        stat = os.stat(filepath)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = schedule_files.get(filepath)
+        if cached and cached[:2] == key:
+            return cached[3], cached[4]
+
+        compiled = open_schedule_cache()
+        entry = compiled.entries.get(filepath) if compiled else None
+        if cached is None and entry and entry[:2] == key:
+            # Warm start, straight from the compiled cache
+            parsed_events = compiled.events(filepath)
+            issues = compiled.issues(filepath)
+            schedule_files[filepath] = (*key, entry[2], parsed_events, issues)
+            return parsed_events, issues
+
+        with open(filepath, "rb") as file:
+            data = file.read()
+        digest = hashlib.sha1(data).hexdigest()
+        if cached and cached[2] == digest:
+            parsed_events, issues = cached[3], cached[4]
+        elif entry and entry[2] == digest:
+            parsed_events = compiled.events(filepath)
+            issues = compiled.issues(filepath)
+        else:
+            # utf-8-sig: spreadsheet apps like to start their CSVs with a BOM
+            parsed_events, issues = parse_schedule_csv(
+                data.decode("utf-8-sig"), filepath
+            )
+        schedule_files[filepath] = (*key, digest, parsed_events, issues)
+        if entry is None or entry[:3] != (*key, digest):
+            schedule_cache_stale = True
+        return parsed_events, issues
+
+
+def update_schedule_cache():
+    # Rewrites the compiled cache if any schedule file changed since it was
+    # written. Only the changed files are parsed, the others are read from
+    # the current cache.
+    global schedule_cache, schedule_cache_stale
+    if not SCHEDULE_CACHE_FILE:
+        return
+
+    with schedule_cache_lock:
+        compiled = open_schedule_cache()
+        schedules = []
+        for day_of_week in range(7):
+            filepath = schedule_path(day_of_week)
+            if not os.path.exists(filepath):
+                continue
+            try:
+                day_events, issues = read_schedule_file(filepath)
+            except (OSError, ValueError) as error:
+                print(f"Schedule cache not updated: {error}")
+                return
+            schedules.append(
+                (filepath, *schedule_files[filepath][:3], day_events, issues)
+            )
+
+        if compiled and compiled.entries.keys() != {s[0] for s in schedules}:
+            schedule_cache_stale = True  # A schedule file was added or removed
+        if not schedule_cache_stale:
+            return
+
+        if schedule_cache is not None:
+            schedule_cache.close()
+            schedule_cache = None
+        try:
+            write_schedule_cache(SCHEDULE_CACHE_FILE, schedules)
+        except OSError as error:
+            print(f"Schedule cache not written: {error}")
+            return
+        schedule_cache_stale = False
+
+
+def read_recurrence_file():
+    # The recurring events rules and issues, re-parsed only when the file
+    # changed. (None, []) when there is no such file.
+    global recurrence_file
+    with schedule_cache_lock:
+        try:
+            stat = os.stat(RECURRENCE_FILE)
+        except FileNotFoundError:
+            recurrence_file = None
+            return None, []
+        key = (stat.st_mtime_ns, stat.st_size)
+        if recurrence_file is None or recurrence_file[:2] != key:
+            with open(RECURRENCE_FILE, encoding="utf-8-sig") as file:
+                rules, issues = parse_recurrence_csv(file.read(), RECURRENCE_FILE)
+            recurrence_file = (*key, RecurrenceSet(rules), issues)
+        return recurrence_file[2], recurrence_file[3]
+
+
+def read_calendar_file(filepath, day):
+    # The events of a day from an .ics file and its issues. The file is
+    # streamed again only when it changed or when the day isn't in the week
+    # imported last time.
+    with schedule_cache_lock:
+        stat = os.stat(filepath)
+        monday = day - timedelta(days=day.weekday())
+        key = (stat.st_mtime_ns, stat.st_size, monday)
+        cached = calendar_files.get(filepath)
+        if cached is None or cached[:3] != key:
+            days, issues = read_ics_file(
+                filepath,
+                monday,
+                monday + timedelta(days=6),
+                CATEGORY_COLORS,
+                day_start,
+            )
+            cached = calendar_files[filepath] = (*key, days, issues)
+        return cached[3].get(day, ()), cached[4]
+
+
+def load_schedule(day):
+    # Reads, validates and normalizes the schedule of a day. Returns its
+    # events, as one list per source (weekly file, recurring events and every
+    # calendar), and every ScheduleIssue found on the way. The events are None
+    # when a file couldn't be read at all, the previous schedule should then be
+    # kept. Doesn't touch Qt nor "events", so it can run on any thread.
+    filepath = schedule_path(day.weekday())
+    try:
+        day_events, issues = read_schedule_file(filepath)
+    except FileNotFoundError:
+        day_events, issues = [], [ScheduleIssue(filepath, 0, "no such file")]
+    except (OSError, ValueError) as error:
+        return None, [ScheduleIssue(filepath, 0, str(error))]
+
+    try:
+        with schedule_cache_lock:
+            recurrences, recurrence_issues = read_recurrence_file()
+            # Only the recurring events of the requested day are ever expanded
+            recurring_events = recurrences.events_for(day) if recurrences else ()
+    except (OSError, ValueError) as error:
+        return None, [*issues, ScheduleIssue(RECURRENCE_FILE, 0, str(error))]
+    sources = [day_events, recurring_events]
+    issues = [*issues, *recurrence_issues]
+
+    for filepath in calendar_paths():
+        try:
+            calendar_events, calendar_issues = read_calendar_file(filepath, day)
+        except FileNotFoundError:
+            continue  # Removed in the meantime
+        except (OSError, ValueError) as error:
+            return None, [*issues, ScheduleIssue(filepath, 0, str(error))]
+        sources.append(calendar_events)
+        issues += calendar_issues
+    return tuple(sources), issues
@@ -0,0 +1,181 @@
+# Append-only log of the finished Pomodoro sessions, in an SQLite database in
+# WAL mode. record() only queues the session: a writer thread inserts them in
+# batches, so a slow disk never blocks the timer. Next to the sessions, a
+# rollup table keeps the totals per schedule day, category and kind, updated
+# in the same transaction. The aggregates read it through its primary key,
+# so they take milliseconds even with years of history.
+import queue
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+
+# A batch is written this many seconds after its first session, or sooner when
+# it reaches BATCH_SIZE sessions or the log is closed
+BATCH_DELAY = 2.0
+BATCH_SIZE = 100
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    start REAL NOT NULL,  -- Unix time
+    end REAL NOT NULL,
+    kind TEXT NOT NULL,  -- "work" or "break"
+    seconds INTEGER NOT NULL,  -- Length, without the pauses
+    day TEXT NOT NULL,  -- Schedule day (see day_start), YYYY-MM-DD
+    event TEXT,  -- Current event when the session started, if any
+    category TEXT NOT NULL  -- Its category, "" without one
+);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    seconds INTEGER NOT NULL,
+    PRIMARY KEY (day, kind, category)
+) WITHOUT ROWID;
+"""
+
+INSERT_SESSION = """
+INSERT INTO sessions (start, end, kind, seconds, day, event, category)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+ADD_TO_TOTALS = """
+INSERT INTO daily_totals (day, category, kind, sessions, seconds)
+VALUES (?, ?, ?, 1, ?)
+ON CONFLICT (day, kind, category) DO UPDATE SET
+    sessions = sessions + 1,
+    seconds = seconds + excluded.seconds
+"""
+
+
+def connect(path, create=True):
+    if create:
+        connection = sqlite3.connect(path, timeout=10)
+    else:
+        # Raises sqlite3.OperationalError instead of creating an empty file
+        uri = f"{Path(path).absolute().as_uri()}?mode=rw"
+        connection = sqlite3.connect(uri, uri=True, timeout=10)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")  # Enough with WAL
+    return connection
+
+
+class SessionLog:
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.writer = None  # Started with the first session
+        self.lock = threading.Lock()
+
+    def record(self, start, end, kind, seconds, day, event=None, category=None):
+        # Never waits for the disk, see write()
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(
+                    target=self.write, name="SessionLog", daemon=True
+                )
+                self.writer.start()
+        self.queue.put((start, end, kind, seconds, day, event, category or ""))
+
+    def close(self):
+        # Writes what is still queued
+        with self.lock:
+            writer, self.writer = self.writer, None
+        if writer is not None:
+            self.queue.put(None)
+            writer.join()
+
+    def write(self):
+        # Writer thread: waits for a session, gathers the ones that follow
+        # for BATCH_DELAY seconds and writes them in one transaction
+        try:
+            connection = connect(self.path)
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except sqlite3.Error as error:
+            print(f"Pomodoro log disabled: {error}")
+            while self.queue.get() is not None:
+                pass  # Discarded
+            return
+
+        stopping = False
+        while not stopping:
+            session = self.queue.get()
+            if session is None:
+                break
+            batch = [session]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    session = self.queue.get(timeout=BATCH_DELAY)
+                except queue.Empty:
+                    break
+                if session is None:
+                    stopping = True
+                    break
+                batch.append(session)
+            try:
+                with connection:
+                    connection.executemany(INSERT_SESSION, batch)
+                    connection.executemany(
+                        ADD_TO_TOTALS,
+                        [
+                            (day, category, kind, seconds)
+                            for _, _, kind, seconds, day, _, category in batch
+                        ],
+                    )
+            except sqlite3.Error as error:
+                print(f"Pomodoro sessions not logged: {error}")
+        connection.close()
+
+    def query(self, sql, parameters):
+        # Aggregates are read on the calling thread with a connection of its
+        # own, WAL lets them run while a batch is being written
+        try:
+            with closing(connect(self.path, create=False)) as connection:
+                return connection.execute(sql, parameters).fetchall()
+        except sqlite3.OperationalError:  # No session logged yet
+            return []
+
+    def sessions(self, start, end):
+        # The sessions started between two Unix times, oldest first, as
+        # (start, end, kind, seconds, day, event, category)
+        return self.query(
+            "SELECT start, end, kind, seconds, day, event, category FROM sessions"
+            " WHERE start >= ? AND start < ? ORDER BY start",
+            (start, end),
+        )
+
+    def focus_by_day(self, first_day, last_day):
+        # {"YYYY-MM-DD": seconds of work} of the schedule days in the range
+        return dict(
+            self.query(
+                "SELECT day, SUM(seconds) FROM daily_totals"
+                " WHERE day BETWEEN ? AND ? AND kind = 'work' GROUP BY day",
+                (first_day.isoformat(), last_day.isoformat()),
+            )
+        )
+
+    def focus_by_category(self, first_day, last_day):
+        # {category: seconds of work}, "" for the sessions without an event
+        return dict(
+            self.query(
+                "SELECT category, SUM(seconds) FROM daily_totals"
+                " WHERE day BETWEEN ? AND ? AND kind = 'work' GROUP BY category",
+                (first_day.isoformat(), last_day.isoformat()),
+            )
+        )
+
+    def focus_by_week(self, first_day, last_day):
+        # {"YYYY-MM-DD" of the Monday: seconds of work}
+        return dict(
+            self.query(
+                "SELECT date(day, '-6 days', 'weekday 1') AS monday, SUM(seconds)"
+                " FROM daily_totals WHERE day BETWEEN ? AND ? AND kind = 'work'"
+                " GROUP BY monday",
+                (first_day.isoformat(), last_day.isoformat()),
+            )
+        )
@@ -0,0 +1,101 @@
+# One instance of the app per user. The first one listens on a local socket
+# (QLocalServer); a later launch connects to it, sends its commands (raise the
+# window, reload the schedule, start the Pomodoro) and exits right away,
+# before the rest of Qt is even imported. Only QtCore and QtNetwork are used.
+#
+# The commands are sent as a single JSON list followed by a newline.
+import getpass
+import json
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+# Milliseconds a second launch waits for the running instance
+CONNECT_TIMEOUT = 200
+WRITE_TIMEOUT = 1000
+
+# Command line flags forwarded to the running instance, see instance_commands()
+FORWARDED_FLAGS = {"--reload": "reload", "--start-pomodoro": "start-pomodoro"}
+
+
+def server_name():
+    # On Unix this is a socket file in the temporary directory, shared by
+    # every user, hence the user name
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = "default"
+    return f"chrono-compass-{user}"
+
+
+def instance_commands(argv):
+    # The window is always brought to the front, then the flags are run in
+    # order
+    return ["raise"] + [FORWARDED_FLAGS[arg] for arg in argv if arg in FORWARDED_FLAGS]
+
+
+def instance_running():
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    running = socket.waitForConnected(CONNECT_TIMEOUT)
+    socket.abort()
+    return running
+
+
+def forward_to_running_instance(argv):
+    # Returns True if another instance is running and got the commands
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return False
+    socket.write(json.dumps(instance_commands(argv)).encode() + b"\n")
+    sent = socket.waitForBytesWritten(WRITE_TIMEOUT)
+    socket.disconnectFromServer()
+    return sent
+
+
+class InstanceServer(QObject):
+    # Listens for later launches and emits their commands
+    commandsReceived = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.acceptConnections)
+
+    def listen(self):
+        # Returns False if another instance is already listening. Any other
+        # failure only means later launches won't be forwarded here.
+        # (With socket options set, Qt replaces an existing socket file rather
+        # than failing, hence the check first.)
+        if instance_running():
+            return False
+        if not self.server.listen(server_name()):
+            # Left over by an instance that crashed, nobody answers on it
+            QLocalServer.removeServer(server_name())
+            if not self.server.listen(server_name()):
+                print(
+                    f"Single instance server not started: {self.server.errorString()}"
+                )
+        return True
+
+    def acceptConnections(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            connection.readyRead.connect(lambda c=connection: self.readCommands(c))
+            connection.disconnected.connect(connection.deleteLater)
+            # The commands may have arrived along with the connection
+            self.readCommands(connection)
+
+    def readCommands(self, connection):
+        if not connection.canReadLine():
+            return
+        line = bytes(connection.readLine()).decode(errors="replace")
+        connection.disconnectFromServer()
+        try:
+            commands = json.loads(line)
+        except ValueError:
+            return
+        if isinstance(commands, list):
+            self.commandsReceived.emit([str(command) for command in commands])
@@ -1,4 +1,4 @@
 #!/bin/bash
 pushd "/home/kiko/Documents/ChronoCompassApp"
-./Chrono-Compass"$@"
+./Chrono-Compass "$@"
 popd
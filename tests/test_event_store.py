@@ -0,0 +1,26 @@
+from event_store import AngularIntervalIndex, Event, EventStore, parse_hhmm
+
+
+def test_event_ending_at_midnight_only_covers_its_hour():
+    late = Event("Late", parse_hhmm("23:00"), parse_hhmm("00:00"), "Other")
+    store = EventStore(6, [late])
+    assert store.at_seconds(23 * 3600 + 1800) == (late,)
+    for hour in (0, 8, 13, 22):
+        assert store.at_seconds(hour * 3600) == ()
+    assert store.current(8 * 3600) == []
+
+
+def test_end_time_24_00_is_midnight():
+    late = Event("Late", parse_hhmm("23:00"), parse_hhmm("24:00"), "Other")
+    index = AngularIntervalIndex([late])
+    assert index.events_at(23 * 3600) == (late,)
+    assert index.events_at(12 * 3600) == ()
+
+
+def test_event_wrapping_around_midnight():
+    sleep = Event("Sleep", parse_hhmm("23:00"), parse_hhmm("07:00"), "Sleep")
+    index = AngularIntervalIndex([sleep])
+    assert index.events_at(23 * 3600) == (sleep,)
+    assert index.events_at(3 * 3600) == (sleep,)
+    assert index.events_at(7 * 3600) == ()
+    assert index.events_at(12 * 3600) == ()
@@ -0,0 +1,140 @@
+import io
+import time
+from datetime import date
+
+import pytest
+
+from ics_import import import_ics, unfolded_lines
+
+MONDAY = date(2026, 1, 5)
+SUNDAY = date(2026, 1, 11)
+
+
+@pytest.fixture
+def utc_local_time(monkeypatch):
+    # Times are converted to the local time zone, pin it
+    if not hasattr(time, "tzset"):
+        pytest.skip("the local time zone can't be changed on this platform")
+    monkeypatch.setenv("TZ", "UTC")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def calendar(*events):
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0"]
+    for properties in events:
+        lines += ["BEGIN:VEVENT", *properties, "END:VEVENT"]
+    return io.StringIO("\r\n".join(lines + ["END:VCALENDAR"]) + "\r\n")
+
+
+def summary(days):
+    return {
+        day: [(event.name, event.start // 60, event.end // 60) for event in events]
+        for day, events in sorted(days.items())
+    }
+
+
+def test_unfolded_lines():
+    lines = ["SUMMARY:Long", " er name", "\tand more", "UID:1"]
+    assert list(unfolded_lines(lines)) == [
+        (1, "SUMMARY:Longer nameand more"),
+        (4, "UID:1"),
+    ]
+
+
+def test_utc_and_tzid_times_are_converted_to_local_time(utc_local_time):
+    days, issues = import_ics(
+        calendar(
+            ["SUMMARY:UTC", "DTSTART:20260105T090000Z", "DTEND:20260105T100000Z"],
+            [
+                "SUMMARY:New York",
+                "DTSTART;TZID=America/New_York:20260106T090000",
+                "DTEND;TZID=America/New_York:20260106T093000",
+            ],
+            ["SUMMARY:Floating", "DTSTART:20260107T090000", "DURATION:PT45M"],
+        ),
+        MONDAY,
+        SUNDAY,
+    )
+    assert issues == []
+    assert summary(days) == {
+        date(2026, 1, 5): [("UTC", 9 * 60, 10 * 60)],
+        date(2026, 1, 6): [("New York", 14 * 60, 14 * 60 + 30)],
+        date(2026, 1, 7): [("Floating", 9 * 60, 9 * 60 + 45)],
+    }
+
+
+def test_events_are_split_at_the_day_start(utc_local_time):
+    days, _ = import_ics(
+        calendar(
+            ["SUMMARY:Late", "DTSTART:20260106T020000", "DTEND:20260106T030000"],
+            ["SUMMARY:Night", "DTSTART:20260107T220000", "DTEND:20260108T080000"],
+        ),
+        MONDAY,
+        SUNDAY,
+    )
+    assert summary(days) == {
+        # 02:00 still belongs to Monday's schedule
+        date(2026, 1, 5): [("Late", 2 * 60, 3 * 60)],
+        date(2026, 1, 7): [("Night", 22 * 60, 6 * 60)],
+        date(2026, 1, 8): [("Night", 6 * 60, 8 * 60)],
+    }
+
+
+def test_recurrence_with_exdate_and_recurrence_id(utc_local_time):
+    days, issues = import_ics(
+        calendar(
+            [
+                "UID:standup",
+                "SUMMARY:Standup",
+                "DTSTART:20260105T090000",
+                "DTEND:20260105T091500",
+                "RRULE:FREQ=DAILY;COUNT=4;WKST=MO",
+                "EXDATE:20260106T090000",
+            ],
+            [
+                "UID:standup",
+                "RECURRENCE-ID:20260107T090000",
+                "SUMMARY:Standup (moved)",
+                "DTSTART:20260107T110000",
+                "DTEND:20260107T111500",
+            ],
+        ),
+        MONDAY,
+        SUNDAY,
+    )
+    assert issues == []
+    assert summary(days) == {
+        date(2026, 1, 5): [("Standup", 9 * 60, 9 * 60 + 15)],
+        date(2026, 1, 7): [("Standup (moved)", 11 * 60, 11 * 60 + 15)],
+        date(2026, 1, 8): [("Standup", 9 * 60, 9 * 60 + 15)],
+    }
+
+
+def test_skipped_and_invalid_events(utc_local_time):
+    days, issues = import_ics(
+        calendar(
+            [
+                "SUMMARY:Holiday",
+                "DTSTART;VALUE=DATE:20260105",
+                "DTEND;VALUE=DATE:20260106",
+            ],
+            [
+                "SUMMARY:Cancelled",
+                "STATUS:CANCELLED",
+                "DTSTART:20260105T090000",
+                "DTEND:20260105T100000",
+            ],
+            ["SUMMARY:Broken", "DTSTART:2026-01-05", "DTEND:20260105T100000"],
+            ["SUMMARY:Next month", "DTSTART:20260205T090000", "DTEND:20260205T100000"],
+        ),
+        MONDAY,
+        SUNDAY,
+        filepath="export.ics",
+    )
+    assert days == {}
+    # Reported at the BEGIN:VEVENT line
+    assert [(issue.filepath, issue.line) for issue in issues] == [("export.ics", 14)]
+    assert "invalid date-time" in issues[0].reason
@@ -0,0 +1,48 @@
+import random
+
+from pomodoro import PomodoroEngine
+
+
+def simulate_late_polls(hours=8, seed=2):
+    # Polled on a per second tick with 0-250ms of latency per wakeup and the
+    # odd 30s stall. Latencies are multiples of 1/1024s so the arithmetic is
+    # exact and any drift, however small, shows up. Returns the engine, the
+    # number of finished sessions and the time left according to the clock.
+    # Also used by benchmarks/bench_widgets.py.
+    rng = random.Random(seed)
+    now = [0.0]
+    engine = PomodoroEngine(25 * 60, 5 * 60, clock=lambda: now[0])
+    engine.start()
+    finished = 0
+    while now[0] < hours * 3600:
+        latency = rng.randrange(257) / 1024 + (30 if rng.random() < 0.001 else 0)
+        wakeup = min(1 - now[0] % 1, engine.msecsToDeadline() / 1000)
+        now[0] += wakeup + latency
+        finished += engine.poll(True)
+
+    cycle = engine.workDuration + engine.breakDuration
+    position = now[0] % cycle
+    if position < engine.workDuration:
+        expected = engine.workDuration - position
+    else:
+        expected = cycle - position
+    return engine, finished, expected
+
+
+def test_no_drift_over_8_hours_of_late_polls():
+    engine, finished, expected = simulate_late_polls()
+    cycle = engine.workDuration + engine.breakDuration
+    position = engine.clock() % cycle
+    assert engine.isWorkTime == (position < engine.workDuration)
+    assert finished == engine.clock() // cycle * 2 + (not engine.isWorkTime)
+    assert engine.timeLeft() - expected == 0
+
+
+def test_sessions_after_a_suspend_are_chained():
+    now = [0.0]
+    engine = PomodoroEngine(25 * 60, 5 * 60, clock=lambda: now[0])
+    engine.start()
+    now[0] = 3 * 3600 + 10  # Six cycles later
+    assert engine.poll(True) == 12
+    assert engine.isWorkTime
+    assert engine.timeLeft() == 25 * 60 - 10
@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+
+from recurrence import RecurrenceSet, Rule, parse_recurrence_csv
+
+
+def days_of(rule, first, last):
+    day = first
+    days = []
+    while day <= last:
+        if rule.occurs_on(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def test_weekly_interval_keeps_to_every_other_week():
+    # 2026-01-05 is a Monday
+    rule = Rule(
+        "Shift", 0, 3600, "Work", date(2026, 1, 5), "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TU"
+    )
+    assert days_of(rule, date(2026, 1, 1), date(2026, 1, 31)) == [
+        date(2026, 1, 5),
+        date(2026, 1, 6),
+        date(2026, 1, 19),
+        date(2026, 1, 20),
+    ]
+
+
+def test_weekly_interval_counts_weeks_from_monday():
+    # Started on a Thursday, the following Monday is already the next week
+    rule = Rule(
+        "Gym",
+        0,
+        3600,
+        "Exercise",
+        date(2026, 1, 8),
+        "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH",
+    )
+    assert days_of(rule, date(2026, 1, 1), date(2026, 1, 31)) == [
+        date(2026, 1, 8),
+        date(2026, 1, 19),
+        date(2026, 1, 22),
+    ]
+
+
+def test_monthly_negative_weekday_ordinal():
+    rule = Rule(
+        "Review", 0, 3600, "Meeting", date(2026, 1, 1), "FREQ=MONTHLY;BYDAY=-1FR"
+    )
+    assert days_of(rule, date(2026, 1, 1), date(2026, 3, 31)) == [
+        date(2026, 1, 30),
+        date(2026, 2, 27),
+        date(2026, 3, 27),
+    ]
+
+
+def test_monthly_negative_month_day():
+    rule = Rule(
+        "Rent", 0, 3600, "Duties", date(2026, 1, 1), "FREQ=MONTHLY;BYMONTHDAY=-1"
+    )
+    assert days_of(rule, date(2026, 1, 1), date(2026, 3, 31)) == [
+        date(2026, 1, 31),
+        date(2026, 2, 28),
+        date(2026, 3, 31),
+    ]
+
+
+def test_count_includes_the_exceptions():
+    # RFC 5545: an excluded occurrence still counts towards COUNT
+    rule = Rule(
+        "Course",
+        0,
+        3600,
+        "Other",
+        date(2026, 1, 5),
+        "FREQ=DAILY;COUNT=3",
+        [date(2026, 1, 6)],
+    )
+    assert days_of(rule, date(2026, 1, 1), date(2026, 1, 31)) == [
+        date(2026, 1, 5),
+        date(2026, 1, 7),
+    ]
+
+
+def test_until_is_inclusive():
+    rule = Rule(
+        "Daily", 0, 3600, "Other", date(2026, 1, 5), "FREQ=DAILY;UNTIL=20260107"
+    )
+    assert days_of(rule, date(2026, 1, 1), date(2026, 1, 31)) == [
+        date(2026, 1, 5),
+        date(2026, 1, 6),
+        date(2026, 1, 7),
+    ]
+
+
+def test_empty_rule_happens_once():
+    rule = Rule("Dentist", 0, 3600, "Other", date(2026, 11, 3))
+    assert days_of(rule, date(2026, 1, 1), date(2026, 12, 31)) == [date(2026, 11, 3)]
+
+
+def test_parse_recurrence_csv_reports_bad_rows():
+    rules, issues = parse_recurrence_csv(
+        "name,start_time,end_time,category,start_date,rule,exceptions\n"
+        'Shift,07:00,15:00,Work,2026-01-05,"FREQ=WEEKLY;BYDAY=MO,TU",2026-01-12\n'
+        "Broken,07:00,15:00,Work,2026-01-05,FREQ=HOURLY,\n",
+        "recurring.csv",
+    )
+    assert [rule.name for rule in rules] == ["Shift"]
+    assert rules[0].exceptions == {date(2026, 1, 12)}
+    assert [(issue.line, issue.filepath) for issue in issues] == [(3, "recurring.csv")]
+
+
+def test_recurrence_set_caches_expanded_days():
+    rules, _ = parse_recurrence_csv(
+        "name,start_time,end_time,category,start_date,rule,exceptions\n"
+        "Standup,09:00,09:15,Meeting,2026-01-05,FREQ=DAILY,\n"
+    )
+    recurrences = RecurrenceSet(rules, cache_size=2)
+    monday = recurrences.events_for(date(2026, 1, 5))
+    assert [event.name for event in monday] == ["Standup"]
+    assert monday[0].start == 9 * 3600
+    assert recurrences.events_for(date(2026, 1, 5)) is monday
+    recurrences.events_for(date(2026, 1, 6))
+    recurrences.events_for(date(2026, 1, 7))
+    assert recurrences.events_for(date(2026, 1, 5)) is not monday
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+
+import schedules
+from event_store import Event, ScheduleIssue
+from schedule_cache import ScheduleCache, write_schedule_cache
+
+SHA1 = "00" * 20
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    monday = [Event("Work", 9 * 3600, 17 * 3600, "Work"), Event("Café", 0, 60, "Food")]
+    tuesday = [Event("Sleep", 23 * 3600, 7 * 3600, "Sleep")]
+    write_schedule_cache(
+        path,
+        [
+            ("a.csv", 1, 100, SHA1, monday, [ScheduleIssue("a.csv", 3, "bad time")]),
+            ("b.csv", 2, 200, "ff" * 20, tuesday, []),
+        ],
+    )
+    cache = ScheduleCache.open(path)
+    try:
+        assert cache.entries["a.csv"][:3] == (1, 100, SHA1)
+        assert cache.entries["b.csv"][:3] == (2, 200, "ff" * 20)
+        assert [
+            (e.name, e.start, e.end, e.category) for e in cache.events("a.csv")
+        ] == [
+            ("Work", 9 * 3600, 17 * 3600, "Work"),
+            ("Café", 0, 60, "Food"),
+        ]
+        assert [(e.name, e.start, e.end) for e in cache.events("b.csv")] == [
+            ("Sleep", 23 * 3600, 7 * 3600)
+        ]
+        assert cache.issues("a.csv") == [ScheduleIssue("a.csv", 3, "bad time")]
+        assert cache.issues("b.csv") == []
+    finally:
+        cache.close()
+
+
+def test_unusable_caches_are_ignored(tmp_path):
+    path = tmp_path / "cache.bin"
+    assert ScheduleCache.open(str(path)) is None  # Missing
+    write_schedule_cache(str(path), [("a.csv", 1, 100, SHA1, [], [])])
+    data = path.read_bytes()
+    path.write_bytes(data[:4] + b"\x01\x00" + data[6:])  # Older format
+    assert ScheduleCache.open(str(path)) is None
+    path.write_bytes(data[:-3])  # Truncated
+    assert ScheduleCache.open(str(path)) is None
+
+
+@pytest.fixture
+def schedule_dir(tmp_path, monkeypatch):
+    # A fresh week_schedules/ and cache, as in a new process
+    monkeypatch.chdir(tmp_path)
+    os.mkdir(schedules.SCHEDULES_DIR)
+    monkeypatch.setattr(schedules, "SCHEDULE_CACHE_FILE", str(tmp_path / "cache.bin"))
+    restart(monkeypatch)
+    yield
+    if schedules.schedule_cache is not None:
+        schedules.schedule_cache.close()
+
+
+def restart(monkeypatch):
+    if schedules.schedule_cache is not None:
+        schedules.schedule_cache.close()
+    monkeypatch.setattr(schedules, "schedule_files", {})
+    monkeypatch.setattr(schedules, "schedule_cache", None)
+    monkeypatch.setattr(schedules, "schedule_cache_stale", False)
+
+
+def write_schedule(text):
+    path = schedules.schedule_path(0)
+    with open(path, "w") as file:
+        file.write("name,start_time,end_time,category\n" + text)
+    return path
+
+
+def no_parsing(text, filepath=""):
+    raise AssertionError(f"{filepath} parsed instead of read from the cache")
+
+
+def test_warm_start_and_stale_detection(schedule_dir, monkeypatch):
+    path = write_schedule("Work,09:00,17:00,Work\n")
+    schedules.update_schedule_cache()
+    assert os.path.exists(schedules.SCHEDULE_CACHE_FILE)
+
+    # Warm start: nothing is parsed
+    restart(monkeypatch)
+    with monkeypatch.context() as patch:
+        patch.setattr(schedules, "parse_schedule_csv", no_parsing)
+        events, issues = schedules.read_schedule_file(path)
+    assert [event.name for event in events] == ["Work"]
+    assert not schedules.schedule_cache_stale
+
+    # Touched but identical: still from the cache, and the cache is kept
+    restart(monkeypatch)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with monkeypatch.context() as patch:
+        patch.setattr(schedules, "parse_schedule_csv", no_parsing)
+        events, issues = schedules.read_schedule_file(path)
+    assert [event.name for event in events] == ["Work"]
+    assert schedules.schedule_cache_stale  # The new mtime has to be saved
+
+    # Changed: parsed again and written back to the cache
+    restart(monkeypatch)
+    write_schedule("Work,09:00,17:00,Work\nGym,18:00,19:00,Exercise\n")
+    events, issues = schedules.read_schedule_file(path)
+    assert [event.name for event in events] == ["Work", "Gym"]
+    assert schedules.schedule_cache_stale
+    schedules.update_schedule_cache()
+    assert not schedules.schedule_cache_stale
+
+    restart(monkeypatch)
+    with monkeypatch.context() as patch:
+        patch.setattr(schedules, "parse_schedule_csv", no_parsing)
+        events, issues = schedules.read_schedule_file(path)
+    assert [event.name for event in events] == ["Work", "Gym"]
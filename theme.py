@@ -0,0 +1,88 @@
+# The app's colors as ready-made QColor, QPen and QBrush objects. They are
+# built once per palette (and category) instead of in the paint loops, and the
+# palette can be switched at runtime with setPalette(): only the palette's
+# swatches are rebuilt, the category ones don't depend on it. Caches of
+# rendered layers use "version" in their keys, like EventStore.version.
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QBrush, QColor, QPen
+
+from event_store import category_names
+
+DIMMED_DARKER = 250  # QColor.darker() factor of past hours and events
+TRANSLUCENT_ALPHA = 128  # 0 to 255, where 255 is fully opaque
+
+
+class Swatch:
+    # One color and its dimmed and translucent variants
+    __slots__ = (
+        "name",
+        "color",
+        "dimmed",
+        "translucent",
+        "translucentDimmed",
+        "brush",
+        "dimmedBrush",
+        "translucentBrush",
+        "translucentDimmedBrush",
+        "pens",
+    )
+
+    def __init__(self, name):
+        self.name = name  # As given, e.g. "#BB86FC"
+        self.color = QColor(name)
+        self.dimmed = self.color.darker(DIMMED_DARKER)
+        self.translucent = QColor(self.color)
+        self.translucent.setAlpha(TRANSLUCENT_ALPHA)
+        self.translucentDimmed = QColor(self.dimmed)
+        self.translucentDimmed.setAlpha(TRANSLUCENT_ALPHA)
+        self.brush = QBrush(self.color)
+        self.dimmedBrush = QBrush(self.dimmed)
+        self.translucentBrush = QBrush(self.translucent)
+        self.translucentDimmedBrush = QBrush(self.translucentDimmed)
+        self.pens = {}  # (width, dimmed) -> QPen, see pen()
+
+    def pen(self, width=1, dimmed=False):
+        key = (width, dimmed)
+        pen = self.pens.get(key)
+        if pen is None:
+            pen = self.pens[key] = QPen(
+                self.dimmed if dimmed else self.color, width, Qt.PenStyle.SolidLine
+            )
+        return pen
+
+
+class Theme(QObject):
+    # theme["primary"] is the palette's Swatch, theme.category(event) the
+    # event's category one. changed is emitted after setPalette().
+    changed = pyqtSignal()
+
+    def __init__(self, palette, categoryColors, parent=None):
+        super().__init__(parent)
+        self.categoryColors = categoryColors
+        self.categories = []  # Swatches indexed by category_id
+        self.palette = None  # Hex strings, e.g. for style sheets
+        self.swatches = {}
+        self.version = 0
+        self.setPalette(palette)
+
+    def __getitem__(self, name):
+        return self.swatches[name]
+
+    def setPalette(self, palette):
+        if palette is self.palette:
+            return
+        self.palette = palette
+        self.swatches = {name: Swatch(color) for name, color in palette.items()}
+        self.version += 1
+        self.changed.emit()
+
+    def category(self, event):
+        # Categories missing from the colors use "Other"
+        categoryId = event.category_id
+        if categoryId >= len(self.categories):
+            default = self.categoryColors["Other"]
+            self.categories.extend(
+                Swatch(self.categoryColors.get(name, default))
+                for name in category_names[len(self.categories) : categoryId + 1]
+            )
+        return self.categories[categoryId]
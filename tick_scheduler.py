@@ -0,0 +1,128 @@
+# One wall-clock aligned timer for the whole app. Widgets subscribe with the
+# granularity they need and every tick hands all of them the same "now"
+# snapshot, so the dial, the list and the countdown never disagree.
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, QTimer, Qt
+
+from event_store import DAY_SECONDS, seconds_since_midnight
+from instrumentation import instruments
+
+SECOND = "second"
+MINUTE = "minute"
+TRANSITION = "transition"  # An event starts or ends
+
+
+class Now:
+    __slots__ = ("datetime", "seconds", "minute")
+
+    def __init__(self, now):
+        self.datetime = now
+        self.seconds = seconds_since_midnight(now)  # Float, since midnight
+        self.minute = now.replace(second=0, microsecond=0)
+
+
+class TickScheduler(QObject):
+    def __init__(self, clock=datetime.now, parent=None):
+        super().__init__(parent)
+        self.clock = clock
+        self.subscribers = {SECOND: [], MINUTE: [], TRANSITION: []}
+        # Returns the next transition (seconds since midnight) after a time of
+        # day, or None. Set by whoever owns the schedule.
+        self.nextTransition = None
+        self.now = Now(clock())
+        # No ticks at all while the window can't be seen, see setSuspended()
+        self.suspended = False
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+
+    def subscribe(self, callback, granularity=SECOND):
+        # callback(now) is called on every tick of that granularity. Bound
+        # methods of QObjects are dropped automatically when it is destroyed.
+        if callback in self.subscribers[granularity]:
+            return
+        self.subscribers[granularity].append(callback)
+        owner = getattr(callback, "__self__", None)
+        if isinstance(owner, QObject):
+            owner.destroyed.connect(lambda: self.unsubscribe(callback))
+        if not self.timer.isActive():
+            self.arm()
+
+    def unsubscribe(self, callback):
+        for callbacks in self.subscribers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def setSuspended(self, suspended):
+        if suspended == self.suspended:
+            return
+        self.suspended = suspended
+        if suspended:
+            self.timer.stop()
+            instruments.timer_stopped("TickScheduler.timer")
+        else:
+            # Catch up right away instead of waiting for the next boundary
+            self.tick(catchUp=True)
+
+    def tick(self, catchUp=False):
+        # catchUp (after a suspend) notifies every subscriber whatever changed
+        if not catchUp:
+            instruments.timer_fired("TickScheduler.timer")
+        previous = self.now
+        self.now = now = Now(self.clock())
+
+        due = list(self.subscribers[SECOND])
+        if catchUp or now.minute != previous.minute:
+            due += self.subscribers[MINUTE]
+        if catchUp or (
+            self.subscribers[TRANSITION] and self.transitionBetween(previous, now)
+        ):
+            due += self.subscribers[TRANSITION]
+        for callback in due:
+            callback(now)
+
+        self.arm()
+
+    def transitionBetween(self, previous, now):
+        if self.nextTransition is None:
+            return False
+        transition = self.nextTransition(previous.seconds)
+        if transition is None:
+            return False
+        elapsed = (now.datetime - previous.datetime).total_seconds()
+        return (transition - previous.seconds) % DAY_SECONDS <= elapsed
+
+    def msecsToNextTick(self):
+        now = self.clock()
+        if self.subscribers[SECOND]:
+            seconds = 1 - now.microsecond / 1e6
+        else:
+            seconds = 60 - now.second - now.microsecond / 1e6
+            if self.subscribers[TRANSITION] and self.nextTransition is not None:
+                nowSeconds = seconds_since_midnight(now)
+                transition = self.nextTransition(nowSeconds)
+                if transition is not None:
+                    seconds = min(seconds, (transition - nowSeconds) % DAY_SECONDS)
+        # Land 1ms after the boundary rather than just before it
+        return round(seconds * 1000) + 1
+
+    def arm(self):
+        if self.suspended or not any(self.subscribers.values()):
+            return
+        msecs = self.msecsToNextTick()
+        instruments.timer_armed("TickScheduler.timer", msecs)
+        self.timer.start(msecs)
+
+
+scheduler = None
+
+
+def tick_scheduler():
+    # Created on first use, once the QApplication exists
+    global scheduler
+    if scheduler is None:
+        scheduler = TickScheduler()
+    return scheduler